@@ -0,0 +1,163 @@
+import numpy as np
+import matplotlib
+from io import BytesIO
+import argparse
+import json
+import platform
+import sys
+import time
+
+import plots
+from metrics import regression_metrics
+
+DEFAULT_SIZES = [200, 2_000, 20_000, 200_000, 1_000_000]
+DEFAULT_DPIS = [72, 150, 300]
+DEFAULT_FIGURES = ['01_mae_overview.png', '02_mae_limitation_comparison.png']
+
+# A stage only counts as a regression if it is both this much slower than the
+# baseline (ratio) and slower by at least MIN_DELTA seconds, so that timer
+# noise on millisecond stages is not flagged.
+DEFAULT_THRESHOLD = 1.2
+MIN_DELTA = 0.005
+
+
+# --------------------------------------------------------------------------------
+# --- Stage Timing ---
+# Each stage is run `repeat` times and the fastest run is kept, which is the
+# least noisy estimate of the cost of the code itself.
+# --------------------------------------------------------------------------------
+def _best_of(repeat, func, setup=None):
+    best, result = np.inf, None
+    for _ in range(repeat):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def bench_size(n, dpis, figures, repeat=3):
+    """Time every pipeline stage at one data size; returns a list of result rows."""
+    rows = []
+
+    def row(stage, seconds, figure=None, dpi=None):
+        rows.append({'n': n, 'figure': figure, 'dpi': dpi, 'stage': stage, 'seconds': seconds})
+        where = f' {figure} @ {dpi} dpi' if dpi else (f' {figure}' if figure else '')
+        print(f"N={n:>9,} {stage:<13}{seconds * 1000:10.1f} ms{where}")
+
+    # Data generation is timed without the metrics generate_data() also computes
+    seconds, _ = _best_of(repeat, lambda: plots.draw_values(n))
+    row('draw', seconds)
+    seconds, (_, stacked_true, stacked_pred) = _best_of(repeat, lambda: plots.generate_scenarios(n))
+    row('scenarios', seconds)
+
+    data = plots.generate_data(n=n)
+    seconds, _ = _best_of(repeat, lambda: (regression_metrics(data['y_true'], data['y_pred']),
+                                           regression_metrics(stacked_true, stacked_pred)))
+    row('metrics', seconds)
+
+    for key in figures:
+        build = plots.FIGURES[key]
+        seconds, _ = _best_of(repeat, lambda: build(data))
+        row('artists', seconds, key)
+
+        # Layout is timed on fresh figures; the last one is kept for savefig.
+        figs = []
+
+        def build_fresh():
+            figs[:] = [build(data)]
+            return tuple(figs)
+
+        seconds, _ = _best_of(repeat, lambda fig: fig.tight_layout(), setup=build_fresh)
+        row('tight_layout', seconds, key)
+        fig = figs[0]
+
+        for dpi in dpis:
+            seconds, _ = _best_of(repeat, lambda: fig.savefig(BytesIO(), dpi=dpi, bbox_inches='tight'))
+            row('savefig', seconds, key, dpi)
+    return rows
+
+
+def warm_up(figures, n=plots.N):
+    """Build, lay out and save every figure once, untimed.
+
+    Otherwise the first timed figure also pays for the lazy matplotlib
+    imports and font loading, and shows up as a regression against any
+    baseline where it did not come first.
+    """
+    data = plots.generate_data(n=n)
+    for key in figures:
+        fig = plots.FIGURES[key](data)
+        fig.tight_layout()
+        fig.savefig(BytesIO(), dpi=72)
+
+
+def run_benchmarks(sizes, dpis, figures, repeat=3):
+    warm_up(figures)
+    results = []
+    for n in sizes:
+        results.extend(bench_size(n, dpis, figures, repeat))
+    return {
+        'meta': {
+            'python': sys.version.split()[0],
+            'numpy': np.__version__,
+            'matplotlib': matplotlib.__version__,
+            'backend': matplotlib.get_backend(),
+            'machine': platform.platform(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+# --------------------------------------------------------------------------------
+# --- Baseline Comparison ---
+# --------------------------------------------------------------------------------
+def _row_key(row):
+    return row['n'], row['figure'], row['dpi'], row['stage']
+
+
+def compare(current, baseline, threshold=DEFAULT_THRESHOLD):
+    """Return the stages of ``current`` that regressed against ``baseline``."""
+    base = {_row_key(row): row['seconds'] for row in baseline['results']}
+    regressions = []
+    for row in current['results']:
+        before = base.get(_row_key(row))
+        if before is None:
+            continue
+        after = row['seconds']
+        if after > before * threshold and after - before > MIN_DELTA:
+            regressions.append(dict(row, baseline=before, ratio=after / before))
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Benchmark data generation, metrics and rendering in plots.py.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help='values of N to sweep')
+    parser.add_argument('--dpis', type=int, nargs='+', default=DEFAULT_DPIS, help='savefig resolutions to sweep')
+    parser.add_argument('--figures', nargs='+', default=DEFAULT_FIGURES, choices=sorted(plots.FIGURES),
+                        metavar='FIGURE', help='registered figures to render (default: %(default)s)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per stage; the fastest is kept')
+    parser.add_argument('--output', default='bench_results.json', help='where to write the JSON results')
+    parser.add_argument('--baseline', help='earlier results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='slowdown ratio that counts as a regression (default: %(default)s)')
+    args = parser.parse_args()
+
+    current = run_benchmarks(args.sizes, args.dpis, args.figures, args.repeat)
+    with open(args.output, 'w') as f:
+        json.dump(current, f, indent=2)
+    print(f"Saved: {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        print("-" * 60)
+        for r in regressions:
+            where = ' '.join(str(part) for part in (r['figure'], r['dpi'] and f"@ {r['dpi']} dpi") if part)
+            print(f"REGRESSION: N={r['n']:,} {r['stage']} {where} "
+                  f"{r['baseline'] * 1000:.1f} ms -> {r['seconds'] * 1000:.1f} ms (x{r['ratio']:.2f})")
+        if regressions:
+            raise SystemExit(f"{len(regressions)} stage(s) regressed against {args.baseline}")
+        print(f"No regressions against {args.baseline}")
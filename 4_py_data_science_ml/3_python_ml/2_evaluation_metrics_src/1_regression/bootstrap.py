@@ -0,0 +1,118 @@
+import numpy as np
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import os
+
+from metrics import RegressionMetrics, regression_metrics
+
+ConfidenceInterval = namedtuple('ConfidenceInterval', ['estimate', 'low', 'high'])
+
+# --------------------------------------------------------------------------------
+# --- Bootstrap Confidence Intervals ---
+# Replicates are drawn in blocks of (b, N) resampled indices. The errors are
+# gathered through the indices, and all three metrics of the b replicates come
+# from one gathered buffer, as in regression_metrics. Only one block is alive
+# at a time, so memory stays bounded by BLOCK_ELEMENTS whatever B and N are.
+# Every block has its own child seed, spawned from `seed` with
+# np.random.SeedSequence. The result therefore depends on the seed and the block
+# size, but not on how many worker processes share the blocks.
+# --------------------------------------------------------------------------------
+BLOCK_ELEMENTS = 4_000_000  # resampled errors per block (~32 MB of float64 + 16 MB of indices)
+
+_worker_errors = None
+
+
+def _init_worker(errors):
+    global _worker_errors
+    _worker_errors = errors
+
+
+def _block_sums(errors, seed, size):
+    """Sum |e| and sum e^2 of ``size`` resamples of the last axis of ``errors``."""
+    n = errors.shape[-1]
+    rng = np.random.default_rng(seed)
+    idx = rng.integers(0, n, (size, n), dtype=np.int32 if n < 2 ** 31 else np.int64)
+    sample = np.take(errors, idx, axis=-1)  # (..., size, n)
+    sum_sq = np.einsum('...i,...i->...', sample, sample)
+    np.abs(sample, out=sample)
+    return sample.sum(axis=-1), sum_sq
+
+
+def _worker_block_sums(seed, size):
+    return _block_sums(_worker_errors, seed, size)
+
+
+def bootstrap_replicates(y_true, y_pred, n_boot=1000, seed=None, block_elements=BLOCK_ELEMENTS, workers=1):
+    """MAE, MSE and RMSE of ``n_boot`` bootstrap resamples, each an array of shape (..., n_boot).
+
+    Inputs are (N,) or a (K, N) stack, resampled along the last axis (each
+    scenario of a stack with the same indices). ``workers`` > 1 spreads the
+    blocks over a process pool; None means one process per CPU.
+    """
+    if n_boot < 1:
+        raise ValueError(f'n_boot must be at least 1, got {n_boot}')
+    errors = np.subtract(np.asarray(y_true, dtype=float), np.asarray(y_pred, dtype=float))
+    n = errors.shape[-1]
+    per_block = max(1, block_elements // errors.size)
+    sizes = [min(per_block, n_boot - start) for start in range(0, n_boot, per_block)]
+    seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+
+    workers = os.cpu_count() if workers is None else workers
+    workers = min(workers, len(sizes))
+    if workers <= 1:
+        results = [_block_sums(errors, s, size) for s, size in zip(seeds, sizes)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(errors,)) as pool:
+            results = list(pool.map(_worker_block_sums, seeds, sizes,
+                                    chunksize=max(1, len(sizes) // (4 * workers))))
+
+    sum_abs = np.concatenate([r[0] for r in results], axis=-1)
+    sum_sq = np.concatenate([r[1] for r in results], axis=-1)
+    mse = sum_sq / n
+    return RegressionMetrics(sum_abs / n, mse, np.sqrt(mse))
+
+
+def bootstrap_ci(y_true, y_pred, n_boot=1000, confidence=0.95, seed=None, block_elements=BLOCK_ELEMENTS,
+                 workers=1):
+    """Percentile bootstrap intervals: a RegressionMetrics of ConfidenceInterval(estimate, low, high)."""
+    if not 0 < confidence < 1:
+        raise ValueError(f'confidence must be between 0 and 1, got {confidence}')
+    replicates = bootstrap_replicates(y_true, y_pred, n_boot, seed, block_elements, workers)
+    alpha = (1 - confidence) / 2
+    intervals = []
+    for estimate, values in zip(regression_metrics(y_true, y_pred), replicates):
+        low, high = np.quantile(values, [alpha, 1 - alpha], axis=-1)
+        intervals.append(ConfidenceInterval(estimate, low, high))
+    return RegressionMetrics(*intervals)
+
+
+if __name__ == '__main__':
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Bootstrap confidence intervals of MAE/MSE/RMSE.')
+    parser.add_argument('paths', nargs='*', help='y_true.npy y_pred.npy (default: synthetic data of size -n)')
+    parser.add_argument('-n', '--n', type=int, default=1_000_000, help='synthetic data size (default: %(default)s)')
+    parser.add_argument('-B', '--n-boot', type=int, default=10_000, help='replicates (default: %(default)s)')
+    parser.add_argument('--confidence', type=float, default=0.95, help='interval level (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='random seed (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None, help='processes (default: one per CPU)')
+    parser.add_argument('--block-elements', type=int, default=BLOCK_ELEMENTS,
+                        help='resampled errors held in memory per block (default: %(default)s)')
+    args = parser.parse_args()
+
+    if len(args.paths) == 2:
+        y_true, y_pred = (np.load(path) for path in args.paths)
+    elif not args.paths:
+        rng = np.random.default_rng(args.seed)
+        y_true = rng.uniform(10, 30, args.n)
+        y_pred = y_true + rng.normal(0, 2, args.n)
+    else:
+        parser.error('expected two .npy files or none')
+
+    start = time.perf_counter()
+    cis = bootstrap_ci(y_true, y_pred, args.n_boot, args.confidence, args.seed, args.block_elements, args.workers)
+    elapsed = time.perf_counter() - start
+    for name, ci in zip(RegressionMetrics._fields, cis):
+        print(f"{name.upper()}: {ci.estimate:.4f}  {args.confidence:.0%} CI [{ci.low:.4f}, {ci.high:.4f}]")
+    print(f"B={args.n_boot}, N={len(y_true)}: {elapsed:.1f} s")
@@ -0,0 +1,138 @@
+import argparse
+import glob
+import importlib
+import os
+import re
+import sys
+import time
+import traceback
+
+import plots
+
+SLIDES = 'slides/slides.md'
+WATCH_INTERVAL = 0.25  # seconds between polls in --watch mode
+
+# Site-absolute image references in a Slidev deck: markdown ![alt](/img/x.png),
+# HTML/Vue src="/img/x.png" and frontmatter `image:` / `background:` keys.
+# Slidev serves the deck's public/ directory at the site root.
+IMAGE_REF = re.compile(r'''(?:\]\(|\bsrc=["']|^\s*(?:image|background):\s*)(/[^\s"')]+)''', re.MULTILINE)
+
+
+# --------------------------------------------------------------------------------
+# --- Slide Scanning ---
+# --------------------------------------------------------------------------------
+def referenced_figures(slides_path, output_dir=plots.OUTPUT_DIR):
+    """Scan a Slidev deck for image references.
+
+    Returns ``(keys, others)``: the registered figure keys the deck uses, in
+    order of first use, and the references no figure generates (static assets).
+    """
+    with open(slides_path) as f:
+        text = f.read()
+    public = os.path.join(os.path.dirname(slides_path), 'public')
+    keys, others = [], []
+    for ref in IMAGE_REF.findall(text):
+        path = os.path.join(public, ref.lstrip('/'))
+        key = os.path.relpath(path, output_dir).replace(os.sep, '/')
+        if key in plots.FIGURES:
+            if key not in keys:
+                keys.append(key)
+        elif ref not in others:
+            others.append(ref)
+    return keys, others
+
+
+def build(slides_path, workers=None, force=False, dpi=plots.DPI):
+    """Render the figures the deck references into its public/img directory.
+
+    Unchanged figures are left to the render cache.
+    """
+    public = os.path.join(os.path.dirname(slides_path), 'public')
+    output_dir = os.path.join(public, 'img')
+    keys, others = referenced_figures(slides_path, output_dir)
+    for ref in others:
+        if not os.path.exists(os.path.join(public, ref.lstrip('/'))):
+            print(f"Warning: {ref} is not a registered figure and does not exist under {public}")
+    if not keys:
+        print(f"No registered figures referenced in {slides_path}")
+        return {}
+
+    data = plots.generate_data()
+    saved, skipped, errors = plots.render_figures(data, keys, output_dir, workers=workers, force=force, dpi=dpi)
+    for key, tb in errors.items():
+        print(f"FAILED: {key}\n{tb}")
+    print(f"{slides_path}: {len(saved)} rendered, {len(skipped)} up to date, {len(errors)} failed")
+    return errors
+
+
+# --------------------------------------------------------------------------------
+# --- Watch Mode ---
+# Polls the deck and the figure code (every .py file next to plots.py, so
+# modules imported lazily during a build are covered too) for modification
+# times. A code change reloads the modules in place, so the
+# render cache sees the new source and re-renders exactly the figures whose
+# code or inputs changed; a deck change only picks up new references.
+# --------------------------------------------------------------------------------
+def _local_modules():
+    """Imported modules that live next to plots.py, plots last (it imports the others)."""
+    # Only modules imported under their own name: skips __main__ and its __mp_main__ alias
+    modules = [module for name, module in list(sys.modules.items())
+               if name == module.__name__ != '__main__' and module is not sys.modules[__name__]
+               and getattr(module, '__file__', None)
+               and os.path.dirname(os.path.abspath(module.__file__)) == plots._HERE]
+    return sorted(modules, key=lambda module: module is plots)
+
+
+def _mtimes(paths):
+    return {path: os.stat(path).st_mtime_ns if os.path.exists(path) else None for path in paths}
+
+
+def watch(slides_path, interval=WATCH_INTERVAL, **build_args):
+    """Build, then rebuild whenever the deck or the figure code changes (Ctrl+C stops)."""
+    sources = [slides_path] + sorted(glob.glob(os.path.join(plots._HERE, '*.py')))
+    seen = _mtimes(sources)
+    build(slides_path, **build_args)
+    print(f"Watching {slides_path} and {len(sources) - 1} modules for changes...")
+    while True:
+        time.sleep(interval)
+        current = _mtimes(sources)
+        changed = [path for path in sources if current[path] != seen[path]]
+        if not changed:
+            continue
+        seen = current
+        print(f"Changed: {', '.join(changed)}")
+        start = time.perf_counter()
+        try:
+            if any(path.endswith('.py') for path in changed):
+                for module in _local_modules():
+                    importlib.reload(module)
+            build(slides_path, **build_args)
+        except Exception:
+            traceback.print_exc()
+        print(f"Rebuilt in {time.perf_counter() - start:.2f} s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render only the figures a Slidev deck references.')
+    parser.add_argument('--slides', default=SLIDES, help='Slidev markdown file (default: %(default)s)')
+    parser.add_argument('--watch', action='store_true', help='keep running and rebuild on every change')
+    parser.add_argument('--interval', type=float, default=WATCH_INTERVAL,
+                        help='seconds between change checks in --watch mode (default: %(default)s)')
+    parser.add_argument('--dpi', type=int, default=plots.DPI, help='PNG resolution (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of render processes (default: one per CPU, 1 = serial)')
+    parser.add_argument('--force', action='store_true', help='re-render even if the cached image is up to date')
+    args = parser.parse_args(argv)
+
+    build_args = dict(workers=args.workers, force=args.force, dpi=args.dpi)
+    if args.watch:
+        try:
+            watch(args.slides, args.interval, **build_args)
+        except KeyboardInterrupt:
+            return None
+    elif build(args.slides, **build_args):
+        return 'some figures failed'
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,461 @@
+import numpy as np
+from collections import namedtuple
+from itertools import islice
+import csv
+
+from quantiles import DEFAULT_K, ROBUST_QUANTILES, QuantileSketch, RobustMetrics
+
+RegressionMetrics = namedtuple('RegressionMetrics', ['mae', 'mse', 'rmse'])
+
+
+# --------------------------------------------------------------------------------
+# --- Fused MAE / MSE / RMSE Kernel ---
+# One difference buffer is allocated (or passed in as `out`); the squared sum
+# is taken from it with a dot product (no squared temporary) and then the
+# buffer is turned into |e| in place for the absolute sum. Works on a single
+# (N,) pair or a (scenarios, N) stack, in which case every metric is an array
+# with one value per scenario.
+#
+# Compact mode: float32 inputs stay float32. The difference buffer is float32
+# and |e| and e^2 are formed in it in place, but both sums accumulate in
+# float64 (np.add.reduce casts block by block, without a float64 copy). That
+# halves the memory and bandwidth of the inputs and the buffer. Against the
+# float64 result on the same data, with u = 2**-24 (float32 unit roundoff) and
+# s_i = |y_i| + |y_hat_i| + |e_i|, to first order in u:
+#     |MAE32 - MAE64|   <= u * mean(s)
+#     |MSE32 - MSE64|   <= u * mean(e^2 + 2 |e| s)
+#     |RMSE32 - RMSE64| <= |MSE32 - MSE64| / (2 RMSE64)
+# (the float64 summation error is far below these). compact_error_bound()
+# evaluates the right-hand sides. For values around 20 with errors around 2
+# this is a relative error below 1e-6.
+# --------------------------------------------------------------------------------
+COMPACT_DTYPE = np.float32
+FLOAT32_ROUNDOFF = 2.0 ** -24
+
+
+def _error_sums(diff):
+    """Sum |e| and sum e^2 along the last axis, consuming the buffer ``diff``."""
+    if diff.dtype == np.float64:
+        sum_sq = np.einsum('...i,...i->...', diff, diff)
+        np.abs(diff, out=diff)
+        return diff.sum(axis=-1), sum_sq
+    np.abs(diff, out=diff)
+    sum_abs = np.add.reduce(diff, axis=-1, dtype=np.float64)
+    np.square(diff, out=diff)
+    return sum_abs, np.add.reduce(diff, axis=-1, dtype=np.float64)
+
+
+def regression_metrics(y_true, y_pred, out=None):
+    """Return MAE, MSE and RMSE of ``y_true`` vs ``y_pred`` along the last axis.
+
+    float32 inputs are evaluated in compact mode (see above); anything else
+    in float64. ``out`` is an optional scratch buffer of the broadcast shape
+    and evaluation dtype for the differences; it is overwritten.
+    """
+    y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+    n = y_true.shape[-1]
+
+    diff = np.subtract(y_true, y_pred, out=out, dtype=np.result_type(y_true, y_pred, COMPACT_DTYPE))
+    sum_abs, sum_sq = _error_sums(diff)
+
+    mae = sum_abs / n
+    mse = sum_sq / n
+    return RegressionMetrics(mae, mse, np.sqrt(mse))
+
+
+def compact_error_bound(y_true, y_pred):
+    """First-order bounds on |compact - float64| for MAE, MSE and RMSE of this data."""
+    y_true = np.asarray(y_true, dtype=float)
+    y_pred = np.asarray(y_pred, dtype=float)
+    errors = np.abs(y_true - y_pred)
+    scale = np.abs(y_true) + np.abs(y_pred) + errors
+    mae_bound = FLOAT32_ROUNDOFF * scale.mean(axis=-1)
+    mse_bound = FLOAT32_ROUNDOFF * (errors * (errors + 2 * scale)).mean(axis=-1)
+    rmse = np.sqrt((errors ** 2).mean(axis=-1))
+    return RegressionMetrics(mae_bound, mse_bound, mse_bound / (2 * rmse))
+
+
+class Workspace:
+    """Named scratch arrays that are reused across calls and grown on demand."""
+
+    def __init__(self):
+        self._buffers = {}
+
+    def get(self, name, shape, dtype=float):
+        """An uninitialized array of ``shape``/``dtype``, sharing memory with earlier requests for ``name``."""
+        shape = tuple(np.atleast_1d(shape))
+        size = int(np.prod(shape))
+        buffer = self._buffers.get(name)
+        if buffer is None or buffer.dtype != dtype or buffer.size < size:
+            buffer = self._buffers[name] = np.empty(size, dtype)
+        return buffer[:size].reshape(shape)
+
+
+# --------------------------------------------------------------------------------
+# --- Streaming (Out-of-Core) Metrics ---
+# Running sums are kept instead of the errors themselves, so memory is bounded
+# by the chunk size. Accumulators of different shards merge by adding their
+# sums, which lets shards be reduced in parallel and combined afterwards.
+# --------------------------------------------------------------------------------
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+class MetricAccumulator:
+    """Running count, sum |e|, sum e^2 and min/max of the error e = y - y_hat.
+
+    The differences of each chunk go into one scratch buffer that is reused
+    from chunk to chunk; float32 chunks are evaluated in compact mode. With
+    ``sketch_k`` a QuantileSketch of |e| is kept as well, for robust();
+    ``seed`` seeds its compactions, so that the same input gives the same
+    quantiles.
+    """
+
+    def __init__(self, sketch_k=None, seed=None):
+        self.count = 0
+        self.sum_abs = 0.0
+        self.sum_sq = 0.0
+        self.min_error = np.inf
+        self.max_error = -np.inf
+        self.sketch = None if sketch_k is None else QuantileSketch(sketch_k, seed)
+        self._workspace = Workspace()
+
+    def update(self, y_true, y_pred):
+        y_true, y_pred = np.asarray(y_true), np.asarray(y_pred)
+        shape = np.broadcast_shapes(y_true.shape, y_pred.shape)
+        dtype = np.result_type(y_true, y_pred, COMPACT_DTYPE)
+        diff = np.subtract(y_true, y_pred, out=self._workspace.get('diff', shape, dtype)).reshape(-1)
+        if diff.size == 0:
+            return self
+        self.count += diff.size
+        self.min_error = min(self.min_error, float(diff.min()))
+        self.max_error = max(self.max_error, float(diff.max()))
+        if self.sketch is not None:
+            self.sketch.update(np.abs(diff))
+        sum_abs, sum_sq = _error_sums(diff)
+        self.sum_abs += float(sum_abs)
+        self.sum_sq += float(sum_sq)
+        return self
+
+    def merge(self, other):
+        if (self.sketch is None) != (other.sketch is None):
+            raise ValueError('cannot merge accumulators with and without a quantile sketch')
+        self.count += other.count
+        self.sum_abs += other.sum_abs
+        self.sum_sq += other.sum_sq
+        self.min_error = min(self.min_error, other.min_error)
+        self.max_error = max(self.max_error, other.max_error)
+        if self.sketch is not None:
+            self.sketch.merge(other.sketch)
+        return self
+
+    def result(self):
+        if self.count == 0:
+            raise ValueError('no samples accumulated')
+        mse = self.sum_sq / self.count
+        return RegressionMetrics(self.sum_abs / self.count, mse, np.sqrt(mse))
+
+    def robust(self):
+        """Approximate MedAE, p90 and p99 absolute error from the sketch."""
+        if self.sketch is None:
+            raise ValueError('accumulator was created without sketch_k')
+        if self.count == 0:
+            raise ValueError('no samples accumulated')
+        return RobustMetrics(*self.sketch.quantile(ROBUST_QUANTILES))
+
+    def __repr__(self):
+        return (f'MetricAccumulator(count={self.count}, sum_abs={self.sum_abs!r}, '
+                f'sum_sq={self.sum_sq!r}, min_error={self.min_error!r}, max_error={self.max_error!r})')
+
+
+def iter_array_chunks(y_true, y_pred, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield aligned ``(y_true, y_pred)`` slices; works on in-memory or np.memmap arrays."""
+    if len(y_true) != len(y_pred):
+        raise ValueError(f'length mismatch: {len(y_true)} true vs {len(y_pred)} predicted values')
+    for start in range(0, len(y_true), chunk_size):
+        yield y_true[start:start + chunk_size], y_pred[start:start + chunk_size]
+
+
+def iter_npy_chunks(true_path, pred_path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield chunks of two ``.npy`` files opened as memory maps."""
+    y_true = np.load(true_path, mmap_mode='r')
+    y_pred = np.load(pred_path, mmap_mode='r')
+    yield from iter_array_chunks(y_true, y_pred, chunk_size)
+
+
+def iter_csv_chunks(path, true_col='y_true', pred_col='y_pred', chunk_size=DEFAULT_CHUNK_SIZE, dtype=float,
+                    group_col=None):
+    """Yield chunks of the ``true_col``/``pred_col`` columns of a CSV file with a header row.
+
+    With ``group_col`` every chunk also carries that column as string labels.
+    """
+    with open(path, newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        i_true, i_pred = header.index(true_col), header.index(pred_col)
+        i_group = None if group_col is None else header.index(group_col)
+        while True:
+            rows = list(islice(reader, chunk_size))
+            if not rows:
+                return
+            chunk = (np.fromiter((row[i_true] for row in rows), dtype=dtype, count=len(rows)),
+                     np.fromiter((row[i_pred] for row in rows), dtype=dtype, count=len(rows)))
+            if i_group is not None:
+                chunk += (np.array([row[i_group] for row in rows]),)
+            yield chunk
+
+
+def streaming_metrics(chunks, accumulator=None):
+    """Fold ``(y_true, y_pred)`` chunks into a MetricAccumulator and return it.
+
+    Also folds ``(y_true, y_pred, groups)`` chunks into a GroupedAccumulator.
+    """
+    accumulator = MetricAccumulator() if accumulator is None else accumulator
+    for chunk in chunks:
+        accumulator.update(*chunk)
+    return accumulator
+
+
+# --------------------------------------------------------------------------------
+# --- Grouped Metrics ---
+# Every sample gets an integer group code, and the per-group count, sum of e,
+# sum |e| and sum e^2 are np.bincount reductions over the codes: one pass per
+# sum whatever the number of groups, with no Python loop over groups. Groups
+# are either equal-width bins of a value (y_true by default) or arbitrary
+# labels. Labels are mapped to codes through a sorted index that is extended
+# vectorially, chunk by chunk, so the codes stay stable while streaming.
+# Accumulators merge like MetricAccumulator, group by group.
+# --------------------------------------------------------------------------------
+GroupedMetrics = namedtuple('GroupedMetrics', ['groups', 'count', 'mae', 'mse', 'rmse', 'bias'])
+
+
+def bin_codes(values, edges):
+    """Bin of every value for increasing ``edges``; values outside go to the first or last bin."""
+    codes = np.searchsorted(edges, values, side='right')
+    codes -= 1
+    np.clip(codes, 0, len(edges) - 2, out=codes)
+    return codes
+
+
+class GroupedAccumulator:
+    """Per-group running count and sums of e, |e| and e^2, with e = y - y_hat.
+
+    With ``edges``, samples are grouped by the bin of the ``groups`` values
+    passed to update() (y_true when omitted) and the groups are the bin
+    indices. Without, ``groups`` holds one label per sample, of any sortable
+    dtype, and the groups are the labels seen so far.
+    """
+
+    def __init__(self, edges=None):
+        self.edges = None if edges is None else np.asarray(edges, dtype=float)
+        n_groups = 0 if edges is None else len(self.edges) - 1
+        self.labels = np.arange(n_groups) if edges is not None else None  # code -> group
+        self.count = np.zeros(n_groups, dtype=np.int64)
+        self.sum_error = np.zeros(n_groups)
+        self.sum_abs = np.zeros(n_groups)
+        self.sum_sq = np.zeros(n_groups)
+        self._sorted_labels = self._sorted_codes = None
+        self._workspace = Workspace()
+
+    def _encode(self, labels):
+        """Codes of ``labels``, giving labels not seen before the next free codes."""
+        unique, inverse = np.unique(labels, return_inverse=True)
+        if self.labels is None:
+            self.labels = unique[:0]
+            self._sorted_labels, self._sorted_codes = unique[:0], np.arange(0)
+        pos = np.searchsorted(self._sorted_labels, unique)
+        found = pos < len(self._sorted_labels)
+        found[found] = self._sorted_labels[pos[found]] == unique[found]
+        new = ~found
+        codes = np.empty(len(unique), dtype=np.intp)
+        codes[found] = self._sorted_codes[pos[found]]
+        codes[new] = np.arange(len(self.labels), len(self.labels) + np.count_nonzero(new))
+        if new.any():
+            dtype = np.result_type(self._sorted_labels, unique)
+            self._sorted_labels = np.insert(self._sorted_labels.astype(dtype), pos[new], unique[new])
+            self._sorted_codes = np.insert(self._sorted_codes, pos[new], codes[new])
+            self.labels = np.concatenate([self.labels.astype(dtype), unique[new]])
+        return codes[inverse.reshape(-1)]
+
+    def _grow(self):
+        extra = len(self.labels) - len(self.count)
+        if extra > 0:
+            self.count = np.concatenate([self.count, np.zeros(extra, dtype=np.int64)])
+            self.sum_error, self.sum_abs, self.sum_sq = (
+                np.concatenate([sums, np.zeros(extra)]) for sums in (self.sum_error, self.sum_abs, self.sum_sq))
+
+    def update(self, y_true, y_pred, groups=None):
+        y_true, y_pred = np.asarray(y_true).reshape(-1), np.asarray(y_pred).reshape(-1)
+        if self.edges is not None:
+            codes = bin_codes(y_true if groups is None else np.asarray(groups).reshape(-1), self.edges)
+        elif groups is None:
+            raise ValueError('groups are required without bin edges')
+        else:
+            codes = self._encode(np.asarray(groups).reshape(-1))
+        if len(codes) != len(y_true):
+            raise ValueError(f'length mismatch: {len(y_true)} samples vs {len(codes)} group values')
+        self._grow()
+        n_groups = len(self.count)
+
+        dtype = np.result_type(y_true, y_pred, COMPACT_DTYPE)
+        diff = np.subtract(y_true, y_pred, out=self._workspace.get('diff', len(y_true), dtype))
+        self.count += np.bincount(codes, minlength=n_groups)
+        self.sum_error += np.bincount(codes, weights=diff, minlength=n_groups)
+        np.abs(diff, out=diff)
+        self.sum_abs += np.bincount(codes, weights=diff, minlength=n_groups)
+        np.square(diff, out=diff)
+        self.sum_sq += np.bincount(codes, weights=diff, minlength=n_groups)
+        return self
+
+    def merge(self, other):
+        if self.edges is not None or other.edges is not None:
+            if self.edges is None or other.edges is None or not np.array_equal(self.edges, other.edges):
+                raise ValueError('cannot merge accumulators with different bin edges')
+            codes = np.arange(len(other.count))
+        elif other.labels is None:
+            return self
+        else:
+            codes = self._encode(other.labels)
+            self._grow()
+        # Codes of distinct groups are distinct, so fancy-index adds do not collide
+        self.count[codes] += other.count
+        self.sum_error[codes] += other.sum_error
+        self.sum_abs[codes] += other.sum_abs
+        self.sum_sq[codes] += other.sum_sq
+        return self
+
+    def result(self):
+        """GroupedMetrics of every group, in bin or sorted label order; NaN for empty bins."""
+        if self.labels is None:
+            raise ValueError('no samples accumulated')
+        order = np.arange(len(self.labels)) if self._sorted_codes is None else self._sorted_codes
+        count = self.count[order]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            mae, mse, bias = (sums[order] / count for sums in (self.sum_abs, self.sum_sq, self.sum_error))
+        return GroupedMetrics(self.labels[order], count, mae, mse, np.sqrt(mse), bias)
+
+    def __repr__(self):
+        kind = 'labels' if self.edges is None else 'bins'
+        return f'GroupedAccumulator({len(self.count)} {kind}, count={int(self.count.sum())})'
+
+
+def grouped_metrics(y_true, y_pred, groups=None, edges=None):
+    """MAE/MSE/RMSE and bias (mean of y - y_hat) per group: GroupedMetrics of arrays.
+
+    Pass ``edges`` to group by bins of ``groups`` (or of y_true), otherwise
+    ``groups`` holds one label per sample.
+    """
+    return GroupedAccumulator(edges).update(y_true, y_pred, groups).result()
+
+
+# --------------------------------------------------------------------------------
+# --- Online Sliding-Window Metrics ---
+# For scored streams, one (y_true, y_pred) pair at a time. The last `window`
+# errors sit in a ring buffer next to running sums of |e| and e^2: a new pair
+# adds its terms and subtracts those of the pair it evicts, so an update is
+# O(1). The sums are recomputed from the buffer once per `window` updates
+# (still O(1) amortized) so that add/subtract rounding cannot drift.
+# --------------------------------------------------------------------------------
+class WindowedMetrics:
+    """Windowed and cumulative MAE/MSE/RMSE of a stream of (y_true, y_pred) pairs."""
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError(f'window must be at least 1, got {window}')
+        self.window = window
+        self.count = 0
+        self._errors = [0.0] * window
+        self._sum_abs = self._sum_sq = 0.0
+        self._total_abs = self._total_sq = 0.0
+
+    def update(self, y_true, y_pred):
+        error = float(y_true) - float(y_pred)
+        slot = self.count % self.window
+        if self.count >= self.window:
+            old = self._errors[slot]
+            self._sum_abs -= abs(old)
+            self._sum_sq -= old * old
+        self._errors[slot] = error
+        self._sum_abs += abs(error)
+        self._sum_sq += error * error
+        self._total_abs += abs(error)
+        self._total_sq += error * error
+        self.count += 1
+        if slot == self.window - 1:
+            self._sum_abs = sum(abs(e) for e in self._errors)
+            self._sum_sq = sum(e * e for e in self._errors)
+        return self
+
+    def windowed(self):
+        """Metrics of the last ``window`` pairs (fewer while the window fills)."""
+        n = min(self.count, self.window)
+        if n == 0:
+            raise ValueError('no samples accumulated')
+        mse = max(self._sum_sq, 0.0) / n
+        return RegressionMetrics(max(self._sum_abs, 0.0) / n, mse, mse ** 0.5)
+
+    def cumulative(self):
+        """Metrics of every pair seen so far."""
+        if self.count == 0:
+            raise ValueError('no samples accumulated')
+        mse = self._total_sq / self.count
+        return RegressionMetrics(self._total_abs / self.count, mse, mse ** 0.5)
+
+    def __repr__(self):
+        return f'WindowedMetrics(window={self.window}, count={self.count})'
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(
+        description='Stream MAE/MSE/RMSE over y_true/y_pred files that do not fit in memory.')
+    parser.add_argument('paths', nargs='+',
+                        help='either y_true.npy y_pred.npy, or one CSV file with a header row')
+    parser.add_argument('--true-col', default='y_true', help='CSV column holding y_true')
+    parser.add_argument('--pred-col', default='y_pred', help='CSV column holding y_pred')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help='rows held in memory at a time')
+    parser.add_argument('--compact', action='store_true',
+                        help='read CSV values as float32 (.npy files keep their own dtype)')
+    parser.add_argument('--group-col', help='CSV column of segment labels: report metrics per segment')
+    parser.add_argument('--bin-edges', type=float, nargs='+', metavar='EDGE',
+                        help='report metrics per y_true bin between these increasing edges')
+    parser.add_argument('--quantiles', action='store_true',
+                        help='also report MedAE and p90/p99 absolute error from a quantile sketch')
+    parser.add_argument('--sketch-k', type=int, default=DEFAULT_K,
+                        help='accuracy parameter of the --quantiles sketch (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the --quantiles sketch (default: %(default)s)')
+    parser.add_argument('--top', type=int, default=20,
+                        help='groups to list, those with the largest MAE first (default: %(default)s)')
+    args = parser.parse_args()
+
+    if args.group_col and args.bin_edges:
+        parser.error('--group-col and --bin-edges are mutually exclusive')
+    if args.quantiles and (args.group_col or args.bin_edges):
+        parser.error('--quantiles is not supported with --group-col or --bin-edges')
+    if len(args.paths) == 2 and not args.group_col:
+        chunks = iter_npy_chunks(*args.paths, chunk_size=args.chunk_size)
+    elif len(args.paths) == 1:
+        dtype = COMPACT_DTYPE if args.compact else float
+        chunks = iter_csv_chunks(args.paths[0], args.true_col, args.pred_col, args.chunk_size, dtype,
+                                 args.group_col)
+    else:
+        parser.error('expected two .npy files or one CSV file (--group-col needs a CSV file)')
+
+    if args.group_col or args.bin_edges:
+        grouped = streaming_metrics(chunks, GroupedAccumulator(args.bin_edges)).result()
+        print(f"N: {grouped.count.sum()}, groups: {len(grouped.groups)}")
+        for i in np.argsort(-np.nan_to_num(grouped.mae, nan=-np.inf), kind='stable')[:args.top]:
+            group = grouped.groups[i]
+            if args.bin_edges:
+                group = f'[{args.bin_edges[group]:g}, {args.bin_edges[group + 1]:g})'
+            print(f"{group}: N: {grouped.count[i]}, MAE: {grouped.mae[i]:.4f}, MSE: {grouped.mse[i]:.4f}, "
+                  f"RMSE: {grouped.rmse[i]:.4f}, bias: {grouped.bias[i]:.4f}")
+    else:
+        acc = streaming_metrics(chunks, MetricAccumulator(args.sketch_k if args.quantiles else None, args.seed))
+        mae, mse, rmse = acc.result()
+        print(f"N: {acc.count}, error range: [{acc.min_error:.4f}, {acc.max_error:.4f}]")
+        print(f"MAE: {mae:.4f}, MSE: {mse:.4f}, RMSE: {rmse:.4f}")
+        if args.quantiles:
+            medae, p90, p99 = acc.robust()
+            print(f"MedAE: {medae:.4f}, P90: {p90:.4f}, P99: {p99:.4f} (sketch, k={args.sketch_k})")
@@ -1,492 +1,1152 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from sklearn.metrics import mean_absolute_error, mean_squared_error
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from metrics import COMPACT_DTYPE, grouped_metrics, regression_metrics
+from bootstrap import bootstrap_ci
+from scenarios import generate_batch
+from quantiles import robust_metrics
+import profiling
+import argparse
+import cProfile
+import functools
+import hashlib
+import inspect
+import json
 import os
+import sys
+import traceback
+
+# matplotlib (figure, collections, colors), Pillow and sklearn are imported inside
+# the functions that need them, so `import plots` stays cheap and side-effect free.
+
+_HERE = os.path.dirname(os.path.abspath(__file__))
 
 OUTPUT_DIR = 'slides/public/img'
-os.makedirs(OUTPUT_DIR, exist_ok=True)
+ALT_OUTPUT_DIR = os.path.join(OUTPUT_DIR, 'alternative')
+
+SEED = 42
+N = 200
+TARGET_MAE = 3.0
+
+# Registry of render tasks: path relative to OUTPUT_DIR -> figure function.
+# Every figure function takes the shared data dict and returns the built
+# Figure; render_figure() does the layout and saving.
+FIGURES = {}
+DPI = 300
+
+# Manifest of cache keys for the images already on disk, kept in OUTPUT_DIR.
+CACHE_MANIFEST = '.render_cache.json'
+
+# Outputs that can be written for each figure: name -> (path relative to the
+# output directory, size, Pillow save options). `{stem}` is the figure key
+# without its extension. Every raster output is cut from one DPI-resolution
+# render of the laid-out figure; the vector formats need a draw of their own.
+EXPORTS = {
+    'png': ('{stem}.png', 'full', {}),
+    'web-png': ('web/{stem}.png', 'web', {}),
+    'webp': ('web/{stem}.webp', 'web', {'lossless': True, 'method': 1}),
+    'thumb': ('thumbs/{stem}.webp', 'thumb', {'quality': 80}),
+    'svg': ('vector/{stem}.svg', 'vector', {}),
+    'pdf': ('vector/{stem}.pdf', 'vector', {}),
+}
+DEFAULT_EXPORTS = ('png', 'webp', 'thumb')
+PNG_COMPRESS_LEVEL = 6  # zlib level of the PNG outputs: 0 (fastest) to 9 (smallest)
+WEB_REDUCE = 4  # web images are 1/WEB_REDUCE of the full raster (75 dpi at DPI=300)
+THUMB_SIZE = (320, 320)  # thumbnails fit inside this box
+
+# Above this many points per axes, scatter markers are replaced by a 2-D density
+# image and only the TOP_K_ERRORS largest error segments are drawn, so render
+# time stays roughly flat as N grows.
+DENSITY_THRESHOLD = 50_000
+DENSITY_BINS = 200
+TOP_K_ERRORS = 500
+TIE_RTOL = 1e-9  # relative difference below which two errors count as tied
+
+# Absolute-error percentile bands on the scenario grids: (label, color, line style)
+QUANTILE_STYLES = (('MedAE', 'seagreen', ':'), ('P90', 'teal', '--'), ('P99', 'black', '-.'))
+
+RESIDUAL_BINS = 10  # value bins of the residual-by-bin figure
+
+COMPACT_BLOCK = 1 << 20  # values drawn per block when generating compact (float32) data
+
+
+def register_figure(path, inputs=()):
+    """Register the decorated function as the renderer for ``path``.
+
+    ``inputs`` names the entries of the shared data dict the figure reads;
+    only those are hashed into its render cache key.
+    """
+    def decorator(func):
+        func.inputs = tuple(inputs)
+        FIGURES[path] = func
+        return func
+    return decorator
+
+
+def new_figure(nrows=1, ncols=1, figsize=None):
+    """Create a Figure and its axes without going through pyplot."""
+    from matplotlib.figure import Figure
+
+    from textcache import CachedTextCanvas
+
+    fig = Figure(figsize=figsize)
+    CachedTextCanvas(fig)  # layout and rasterization then reuse cached mathtext
+    return fig, fig.subplots(nrows, ncols)
+
+
+def bin_index(values, low, scale, bins):
+    """Equal-width bin of every value, scaled in one in-place buffer."""
+    scaled = np.subtract(values, low)
+    scaled *= scale
+    index = scaled.astype(np.intp)
+    np.minimum(index, bins - 1, out=index)
+    return index
+
+
+def density_grid(x, y, bins=DENSITY_BINS):
+    """2-D point counts on a ``bins`` x ``bins`` grid via one bincount.
+
+    Equivalent to np.histogram2d on equal-width bins spanning the data, but
+    the bin index is computed arithmetically instead of by binary search.
+    Returns ``(counts, (x_min, x_max, y_min, y_max))`` with counts indexed [y, x].
+    """
+    x_min, x_max, y_min, y_max = x.min(), x.max(), y.min(), y.max()
+    x_scale = bins / (x_max - x_min) if x_max > x_min else 0.0
+    y_scale = bins / (y_max - y_min) if y_max > y_min else 0.0
+    ix = bin_index(x, x_min, x_scale, bins)
+    iy = bin_index(y, y_min, y_scale, bins)
+    iy *= bins
+    iy += ix
+    counts = np.bincount(iy, minlength=bins * bins).reshape(bins, bins)
+    return counts, (x_min, x_max, y_min, y_max)
+
+
+def add_points(ax, x, y, color='blue', s=20, alpha=0.6, label=None, zorder=None):
+    """Scatter the points, or draw them as a 2-D density image above DENSITY_THRESHOLD.
+
+    The density image sits below the error lines (zorder 1) so that the
+    largest errors stay visible on top of it.
+    """
+    if len(x) <= DENSITY_THRESHOLD:
+        return ax.scatter(x, y, color=color, s=s, alpha=alpha, label=label, zorder=zorder)
+
+    from matplotlib.colors import LogNorm
+
+    counts, extent = density_grid(x, y, DENSITY_BINS)
+    image = ax.imshow(np.ma.masked_equal(counts, 0), origin='lower', aspect='auto', extent=extent,
+                      cmap='Blues', norm=LogNorm(vmin=1), interpolation='nearest', zorder=1)
+    # Keep the usual autoscale margins around the image
+    image.sticky_edges.x.clear()
+    image.sticky_edges.y.clear()
+    if label:
+        # Images have no legend handler; an empty scatter stands in for them
+        ax.scatter([], [], color=color, s=s, alpha=alpha, label=f'{label} (density)')
+    return image
+
+
+def set_points(artist, x, y):
+    """Move the points drawn by add_points() to new coordinates."""
+    if hasattr(artist, 'set_offsets'):
+        artist.set_offsets(np.column_stack([x, y]))
+        return
+    counts, extent = density_grid(x, y, DENSITY_BINS)
+    artist.set_data(np.ma.masked_equal(counts, 0))
+    artist.set_extent(extent)
+    artist.sticky_edges.x.clear()
+    artist.sticky_edges.y.clear()
+
+
+def error_segments(y_t, y_p, alternative=False):
+    """(N, 2, 2) error-line segments: vertical from (y, y) to (y, y_hat), or
+    horizontal from (y_hat, y) to (y, y) in the alternative orientation."""
+    if alternative:
+        return np.column_stack([y_p, y_t, y_t, y_t]).reshape(-1, 2, 2)
+    return np.column_stack([y_t, y_t, y_t, y_p]).reshape(-1, 2, 2)
+
+
+def largest_errors(y_t, y_p, errors):
+    """Above DENSITY_THRESHOLD points keep only the TOP_K_ERRORS largest errors.
+
+    Every error above the cut is kept; errors tied at the cut (a scenario of
+    equal errors can have thousands) are taken evenly spaced along y_true,
+    so the drawn segments cover the range the ties span. Ties are equal up
+    to rounding: |(y + e) - y| differs from e in the last bits, and picking
+    by those bits favours the large values of y.
+    """
+    if len(errors) > DENSITY_THRESHOLD:
+        cut = np.partition(errors, -TOP_K_ERRORS)[-TOP_K_ERRORS]
+        tolerance = abs(cut) * TIE_RTOL
+        above = np.flatnonzero(errors > cut + tolerance)
+        tied = np.flatnonzero(np.abs(errors - cut) <= tolerance)
+        tied = tied[np.argsort(y_t[tied], kind='stable')]
+        spaced = np.linspace(0, len(tied) - 1, TOP_K_ERRORS - len(above)).round().astype(np.intp)
+        top = np.concatenate([above, tied[spaced]])
+        return y_t[top], y_p[top], errors[top]
+    return y_t, y_p, errors
+
+
+def add_error_segments(ax, y_t, y_p, errors, threshold, alternative=False):
+    """Draw every error line of a scenario as a single LineCollection.
+
+    Errors above ``threshold`` are drawn red and thick, the rest dark orange.
+    Above DENSITY_THRESHOLD points only the TOP_K_ERRORS largest are drawn.
+    """
+    from matplotlib.collections import LineCollection
+    from matplotlib.colors import to_rgba
+
+    y_t, y_p, errors = largest_errors(y_t, y_p, errors)
+    large = (errors > threshold)[:, np.newaxis]
+    colors = np.where(large, to_rgba('red', 0.6), to_rgba('darkorange', 0.6))
+    linewidths = np.where(large[:, 0], 2, 0.5)
+
+    lines = LineCollection(error_segments(y_t, y_p, alternative), colors=colors,
+                           linewidths=linewidths, linestyle='-', capstyle='projecting', zorder=2)
+    ax.add_collection(lines)
+    return lines
+
+
+def quantile_segments(low, high, offsets):
+    """(2 * len(offsets), 2, 2) lines y = x + d and y = x - d over [low, high] for every offset d."""
+    offsets = np.repeat(offsets, 2) * np.tile([1, -1], len(offsets))
+    return np.stack([np.column_stack([np.full_like(offsets, low), low + offsets]),
+                     np.column_stack([np.full_like(offsets, high), high + offsets])], axis=1)
+
+
+def add_quantile_bands(ax, low, high, quantiles):
+    """Draw the percentile bands of |e|: a point lies between the two P90
+    lines exactly when its absolute error is at most the P90 error.
+
+    ``quantiles`` holds the MedAE, P90 and P99 of one scenario; returns one
+    LineCollection per quantile, in QUANTILE_STYLES order.
+    """
+    from matplotlib.collections import LineCollection
+
+    bands = []
+    for (name, color, style), offset in zip(QUANTILE_STYLES, quantiles):
+        band = LineCollection(quantile_segments(low, high, [offset]), colors=color, linestyles=style,
+                              linewidths=1.2, alpha=0.8, zorder=2, label=f'{name}: {offset:.2f}')
+        ax.add_collection(band, autolim=False)  # reference lines: the data alone sets the limits
+        bands.append(band)
+    return bands
+
+
+def rescale(ax):
+    """Recompute the data limits from the current artists and autoscale the view."""
+    ax.relim()
+    ax.autoscale_view()
+
 
 # --------------------------------------------------------------------------------
 # --- Generate Random Data: 180+ points ---
 # --------------------------------------------------------------------------------
-np.random.seed(42)
-N = 200
-y_true = np.random.uniform(10, 30, N)
-y_pred = y_true + np.random.normal(0, 2, N)  # Add some noise
+def generate_data(n=N, seed=SEED, target_mae=TARGET_MAE, n_boot=0, confidence=0.95, workers=1, compact=False):
+    """Build the data shared by every figure: y_true/y_pred, metrics and scenarios.
+
+    With ``n_boot`` > 0 the metrics also get bootstrap confidence intervals,
+    which the figures print next to the point estimates. ``compact`` keeps
+    every array in float32 (see metrics.py for the accuracy this costs).
+    """
+    dtype = COMPACT_DTYPE if compact else float
+    with profiling.stage('data'):
+        np.random.seed(seed)
+        y_true, y_pred = draw_values(n, dtype)
+
+    # ----------------------------------------------------------------------------
+    # --- Manual Calculations (cross-checked against sklearn by sklearn_metrics) ---
+    # ----------------------------------------------------------------------------
+    with profiling.stage('metrics'):
+        # MAE, MSE, RMSE: Manual calculation (single fused pass)
+        mae_manual, mse_manual, rmse_manual = regression_metrics(y_true, y_pred)
+
+    with profiling.stage('data'):
+        scenarios, stacked_true, stacked_pred = generate_scenarios(n, target_mae, dtype)
+
+    with profiling.stage('metrics'):
+        # MAE, MSE, RMSE of every scenario from one call on the (scenarios, N) stack
+        scenario_metrics = regression_metrics(stacked_true, stacked_pred)
+        # Exact MedAE and p90/p99 absolute error (the data is in memory, so no sketch is needed)
+        scenario_quantiles = robust_metrics(stacked_true, stacked_pred)
+
+        # Per-bin metrics by actual and by predicted value, on edges shared by both
+        bin_edges = np.linspace(min(y_true.min(), y_pred.min()), max(y_true.max(), y_pred.max()),
+                                RESIDUAL_BINS + 1)
+        bins_by_true = grouped_metrics(y_true, y_pred, edges=bin_edges)
+        bins_by_pred = grouped_metrics(y_true, y_pred, y_pred, edges=bin_edges)
+
+        metric_intervals = scenario_intervals = None
+        if n_boot:
+            metric_intervals = bootstrap_ci(y_true, y_pred, n_boot, confidence, seed=seed, workers=workers)
+            scenario_intervals = bootstrap_ci(stacked_true, stacked_pred, n_boot, confidence, seed=seed,
+                                              workers=workers)
+
+    return {
+        'N': n,
+        'target_mae': target_mae,
+        'y_true': y_true,
+        'y_pred': y_pred,
+        'mae_manual': mae_manual,
+        'mse_manual': mse_manual,
+        'rmse_manual': rmse_manual,
+        'scenarios': scenarios,
+        'scenario_metrics': scenario_metrics,
+        'scenario_quantiles': scenario_quantiles,
+        'bin_edges': bin_edges,
+        'bins_by_true': bins_by_true,
+        'bins_by_pred': bins_by_pred,
+        'metric_intervals': metric_intervals,
+        'scenario_intervals': scenario_intervals,
+    }
+
+
+def sklearn_metrics(data):
+    """MAE, MSE and RMSE of ``data`` recomputed with sklearn, to cross-check the manual values."""
+    from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+    mse_sklearn = mean_squared_error(data['y_true'], data['y_pred'])
+    return mean_absolute_error(data['y_true'], data['y_pred']), mse_sklearn, np.sqrt(mse_sklearn)
+
 
 # --------------------------------------------------------------------------------
-# --- Manual Calculations vs sklearn ---
+# --- MAE Limitation - Extreme Cases ---
+# All have same MAE but very different error patterns
+# --------------------------------------------------------------------------------
+def draw_values(n=N, dtype=float):
+    """Draw the y_true/y_pred of the overview figures from the global NumPy random state."""
+    if dtype != float:
+        y_true = draw_blocks(lambda size: np.random.uniform(10, 30, size), n, dtype)
+        y_pred = draw_blocks(lambda size: np.random.normal(0, 2, size), n, dtype)
+        y_pred += y_true  # Add some noise
+        return y_true, y_pred
+    y_true = np.random.uniform(10, 30, n)
+    y_pred = y_true + np.random.normal(0, 2, n)  # Add some noise
+    return y_true, y_pred
+
+
+def generate_scenarios(n=N, target_mae=TARGET_MAE, dtype=float):
+    """Draw the four same-MAE scenarios from the global NumPy random state.
+
+    Returns ``(scenarios, stacked_true, stacked_pred)``: the scenarios are
+    (y_true, y_pred, title) with rows of the two (scenarios, N) stacks as data.
+    """
+    patterns = [
+        ('balanced', 'Normal: Balanced Errors'),
+        ('balanced', 'Normal: Slight Variation'),
+        ('half_perfect', 'EXTREME: Half Perfect, Half Large Errors'),
+        ('few_outliers', 'EXTREME: Most Perfect, Few Massive Errors'),
+    ]
+    stacked_true = np.empty((len(patterns), n), dtype)
+    stacked_pred = np.empty((len(patterns), n), dtype)
+    for i, (pattern, _) in enumerate(patterns):
+        stacked_true[i], stacked_pred[i] = generate_batch(1, n, pattern, target_mae, rng=np.random)
+    scenarios = [(y_true, y_pred, title) for y_true, y_pred, (_, title) in zip(stacked_true, stacked_pred, patterns)]
+    return scenarios, stacked_true, stacked_pred
+
+
+def draw_blocks(draw, n, dtype=COMPACT_DTYPE, block=COMPACT_BLOCK):
+    """Fill an (n,) ``dtype`` array from ``draw(size)`` one block at a time.
+
+    Only one block of the float64 draws is alive at a time. The legacy NumPy
+    stream gives the same values block by block as in one call.
+    """
+    out = np.empty(n, dtype)
+    for start in range(0, n, block):
+        out[start:start + block] = draw(min(block, n - start))
+    return out
+
+
+# --------------------------------------------------------------------------------
+# --- Figure Templates ---
+# The standard (actual on x) and alternative (predicted on x) version of a
+# figure differ only in which array is drawn on which axis and in a few labels.
+# A template builds the axes, text boxes, formulas and legend once; orient()
+# then swaps the data of the existing artists and updates the labels, so the
+# alternative version is produced without re-creating the figure.
 # --------------------------------------------------------------------------------
-# MAE: Manual calculation
-errors_abs = np.abs(y_true - y_pred)
-mae_manual = np.sum(errors_abs) / N
-mae_sklearn = mean_absolute_error(y_true, y_pred)
+MAE_FORMULA = r'$\text{MAE} = \frac{1}{N} \sum_{i=1}^{N} |y_i - \hat{y}_i|$'
+MSE_FORMULA = r'$\text{MSE} = \frac{1}{N} \sum_{i=1}^{N} (y_i - \hat{y}_i)^2$'
+RMSE_FORMULA = r'$\text{RMSE} = \sqrt{\frac{1}{N} \sum_{i=1}^{N} (y_i - \hat{y}_i)^2}$'
+
+# (x label, y label) and scatter legend label, indexed by `alternative`
+AXIS_LABELS = ((r'Actual Value ($y$)', r'Predicted Value ($\hat{y}$)'),
+               (r'Predicted Value ($\hat{y}$)', r'Actual Value ($y$)'))
+POINT_LABELS = (r'Predicted Points ($\hat{y}$)', r'Actual Points ($y$)')
+
+
+def metric_label(name, value, interval=None):
+    """'MAE: 2.00', followed by the bootstrap interval ' [1.85, 2.15]' if there is one."""
+    text = f'{name}: {value:.2f}'
+    if interval is not None:
+        text += f' [{interval.low:.2f}, {interval.high:.2f}]'
+    return text
+
+
+class FigureTemplate:
+    """Artists of one figure, built once in the standard orientation."""
+
+    def __init__(self, data):
+        self.data = data
+        self.alternative = False
+        self.build()
+
+    def build(self):
+        raise NotImplementedError
+
+    def orient(self, alternative):
+        """Point the artists at the standard or alternative orientation; returns the Figure."""
+        import matplotlib
+
+        if alternative != self.alternative:
+            self.update(alternative)
+            self.alternative = alternative
+            # Start tight_layout from the default margins, as for a new figure
+            self.fig.subplots_adjust(**{name: matplotlib.rcParams[f'figure.subplot.{name}']
+                                        for name in ('left', 'bottom', 'right', 'top', 'wspace', 'hspace')})
+        return self.fig
+
+    def update(self, alternative):
+        raise NotImplementedError
+
+    def metric_text(self, metric, index=None):
+        """Label of data metric ``metric`` ('mae', 'mse' or 'rmse'), or of scenario ``index``'s."""
+        if index is None:
+            value, intervals = self.data[f'{metric}_manual'], self.data['metric_intervals']
+        else:
+            value, intervals = getattr(self.data['scenario_metrics'], metric)[index], self.data['scenario_intervals']
+        interval = None
+        if intervals is not None:
+            interval = getattr(intervals, metric)
+            if index is not None:
+                interval = interval._make(field[index] for field in interval)
+        return metric_label(metric.upper(), value, interval)
+
+
+def register_template(standard_key, alternative_key, inputs=()):
+    """Register both orientations of the decorated FigureTemplate subclass."""
+    def decorator(cls):
+        for key, alternative in ((standard_key, False), (alternative_key, True)):
+            register_figure(key, inputs)(_template_figure(cls, alternative))
+        return cls
+    return decorator
+
+
+def _template_figure(cls, alternative):
+    def build_figure(data):
+        return cls(data).orient(alternative)
+    build_figure.template = cls
+    build_figure.alternative = alternative
+    return build_figure
+
+
+class OverviewTemplate(FigureTemplate):
+    """Single-axes overview: points, perfect-prediction line, the first 20 error
+    lines, the metric formula and the metric values."""
+    formula = None
+    formula_color = None
+    color = None
+    result_color = None  # defaults to `color`
+    line_alpha = 0.5
+    titles = (None, None)
+
+    def line_widths(self, count):
+        return 1
+
+    def result_text(self, alternative):
+        raise NotImplementedError
+
+    def build(self):
+        from matplotlib.collections import LineCollection
+        from matplotlib.colors import to_rgba
+
+        y_true, y_pred = self.data['y_true'], self.data['y_pred']
+        self.count = min(20, self.data['N'])
+        self.fig, self.ax = new_figure(figsize=(8, 6))
+        ax = self.ax
+
+        self.points = add_points(ax, y_true, y_pred, color='blue', s=20, alpha=0.6, label=POINT_LABELS[False])
+        self.diagonal, = ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()],
+                                 color='gray', linestyle='--', label=r'Perfect Prediction ($y = \hat{y}$)')
+
+        # Sample error lines (first 20 for clarity)
+        self.error_lines = LineCollection(
+            error_segments(y_true[:self.count], y_pred[:self.count]),
+            colors=to_rgba(self.color, self.line_alpha), linewidths=self.line_widths(self.count),
+            linestyle='-', capstyle='projecting', zorder=2)
+        ax.add_collection(self.error_lines)
+
+        ax.text(0.95, 0.1, self.formula, transform=ax.transAxes, fontsize=14,
+                verticalalignment='bottom', horizontalalignment='right',
+                bbox=dict(boxstyle="round,pad=0.5", fc=self.formula_color, alpha=0.7))
+
+        self.result = ax.text(0.05, 0.95, self.result_text(False), transform=ax.transAxes, fontsize=10,
+                              verticalalignment='top', horizontalalignment='left',
+                              color=self.result_color or self.color,
+                              fontweight='bold', bbox=dict(boxstyle="round,pad=0.4", fc="white", alpha=0.8))
 
-# MSE: Manual calculation
-errors_squared = (y_true - y_pred) ** 2
-mse_manual = np.sum(errors_squared) / N
-mse_sklearn = mean_squared_error(y_true, y_pred)
+        ax.set_xlabel(AXIS_LABELS[False][0], fontsize=12)
+        ax.set_ylabel(AXIS_LABELS[False][1], fontsize=12)
+        ax.set_title(self.titles[False], fontsize=14, fontweight='bold')
+        ax.grid(True, linestyle=':', alpha=0.6)
+        legend = ax.legend(fontsize=10)
+        self.point_label = next(text for text in legend.get_texts()
+                                if text.get_text().startswith(POINT_LABELS[False]))
 
-# RMSE: Manual calculation
-rmse_manual = np.sqrt(mse_manual)
-rmse_from_sklearn = np.sqrt(mse_sklearn)
+    def update(self, alternative):
+        y_true, y_pred, ax = self.data['y_true'], self.data['y_pred'], self.ax
+        x, y = (y_pred, y_true) if alternative else (y_true, y_pred)
+
+        set_points(self.points, x, y)
+        self.diagonal.set_data([x.min(), x.max()], [x.min(), x.max()])
+        self.error_lines.set_segments(
+            error_segments(y_true[:self.count], y_pred[:self.count], alternative))
+        self.result.set_text(self.result_text(alternative))
+
+        ax.xaxis.label.set_text(AXIS_LABELS[alternative][0])
+        ax.yaxis.label.set_text(AXIS_LABELS[alternative][1])
+        ax.title.set_text(self.titles[alternative])
+        self.point_label.set_text(self.point_label.get_text().replace(
+            POINT_LABELS[not alternative], POINT_LABELS[alternative]))
+        rescale(ax)
+
+
+class ScenarioGridTemplate(FigureTemplate):
+    """2x2 grid of the same-MAE scenarios with every error line drawn."""
+    text_fontsize = None
+    text_box = None
+
+    def metrics_text(self, index):
+        raise NotImplementedError
+
+    def suptitle(self, alternative):
+        raise NotImplementedError
+
+    def build(self):
+        target_mae = self.data['target_mae']
+        self.fig, axes = new_figure(2, 2, figsize=(14, 12))
+        self.panels = []
+        quantiles = self.data['scenario_quantiles']
+
+        for idx, (y_t, y_p, title) in enumerate(self.data['scenarios']):
+            ax = axes.flat[idx]
+            errors = np.subtract(y_t, y_p)
+            np.abs(errors, out=errors)
+
+            points = add_points(ax, y_t, y_p, color='blue', s=10, alpha=0.5, zorder=3)
+            diagonal, = ax.plot([y_t.min(), y_t.max()], [y_t.min(), y_t.max()],
+                                color='gray', linestyle='--', linewidth=1.5, alpha=0.5)
+
+            # Plot error lines - show all for extreme cases
+            lines = add_error_segments(ax, y_t, y_p, errors, threshold=target_mae * 2)
+            bands = add_quantile_bands(ax, y_t.min(), y_t.max(), [field[idx] for field in quantiles])
+            ax.legend(handles=bands, loc='lower right', fontsize=8, title=r'$|y - \hat{y}|$ percentiles',
+                      title_fontsize=8)
+
+            ax.text(0.05, 0.95, self.metrics_text(idx), transform=ax.transAxes,
+                    fontsize=self.text_fontsize, verticalalignment='top', horizontalalignment='left',
+                    bbox=self.text_box, fontweight='bold')
+
+            ax.set_xlabel(AXIS_LABELS[False][0], fontsize=10)
+            ax.set_ylabel(AXIS_LABELS[False][1], fontsize=10)
+            ax.set_title(title, fontsize=11, fontweight='bold')
+            ax.grid(True, linestyle=':', alpha=0.6)
+            self.panels.append((ax, points, diagonal, lines, bands, largest_errors(y_t, y_p, errors)))
+
+        self.title = self.fig.suptitle(self.suptitle(False), fontsize=16, fontweight='bold', y=0.995)
+
+    def update(self, alternative):
+        quantiles = self.data['scenario_quantiles']
+        for idx, ((y_t, y_p, _), (ax, points, diagonal, lines, bands, drawn)) in enumerate(
+                zip(self.data['scenarios'], self.panels)):
+            x, y = (y_p, y_t) if alternative else (y_t, y_p)
+            set_points(points, x, y)
+            diagonal.set_data([x.min(), x.max()], [x.min(), x.max()])
+            lines.set_segments(error_segments(drawn[0], drawn[1], alternative))
+            # y = x +/- d is the same pair of lines with the axes swapped; only the span changes
+            for band, offset in zip(bands, (field[idx] for field in quantiles)):
+                band.set_segments(quantile_segments(x.min(), x.max(), [offset]))
+            ax.xaxis.label.set_text(AXIS_LABELS[alternative][0])
+            ax.yaxis.label.set_text(AXIS_LABELS[alternative][1])
+            rescale(ax)
+        self.title.set_text(self.suptitle(alternative))
 
-print(f"MAE - Manual: {mae_manual:.4f}, sklearn: {mae_sklearn:.4f}")
-print(f"MSE - Manual: {mse_manual:.4f}, sklearn: {mse_sklearn:.4f}")
-print(f"RMSE - Manual: {rmse_manual:.4f}, from sklearn MSE: {rmse_from_sklearn:.4f}")
 
 # --------------------------------------------------------------------------------
 # --- Plot 1: MAE Overview ---
 # --------------------------------------------------------------------------------
-fig, ax = plt.subplots(figsize=(8, 6))
-ax.scatter(y_true, y_pred, color='blue', s=20, alpha=0.6, label='Predicted Points ($\hat{y}$)')
-ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()], 
-        color='gray', linestyle='--', label='Perfect Prediction ($y = \hat{y}$)')
-
-# Plot sample error lines (show first 20 for clarity)
-for i in range(min(20, N)):
-    ax.plot([y_true[i], y_true[i]], [y_true[i], y_pred[i]], 
-           color='darkorange', linestyle='-', linewidth=1, alpha=0.5)
-
-mae_formula = r'$\text{MAE} = \frac{1}{N} \sum_{i=1}^{N} |y_i - \hat{y}_i|$'
-ax.text(0.95, 0.1, mae_formula, transform=ax.transAxes, fontsize=14,
-        verticalalignment='bottom', horizontalalignment='right',
-        bbox=dict(boxstyle="round,pad=0.5", fc="lightblue", alpha=0.7))
-
-# result_text = f'MAE: {mae_manual:.2f}\nMSE: {mse_manual:.2f}\nRMSE: {rmse_manual:.2f}'
-result_text = f'MAE: {mae_sklearn:.2f}'
-ax.text(0.05, 0.95, result_text, transform=ax.transAxes, fontsize=10,
-        verticalalignment='top', horizontalalignment='left', color='blue', fontweight='bold',
-        bbox=dict(boxstyle="round,pad=0.4", fc="white", alpha=0.8))
-
-ax.set_xlabel('Actual Value ($y$)', fontsize=12)
-ax.set_ylabel('Predicted Value ($\hat{y}$)', fontsize=12)
-ax.set_title('Mean Absolute Error (MAE): Linear Error Measurement', fontsize=14, fontweight='bold')
-ax.grid(True, linestyle=':', alpha=0.6)
-ax.legend(fontsize=10)
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, '01_mae_overview.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {OUTPUT_DIR}/01_mae_overview.png")
+@register_template('01_mae_overview.png', 'alternative/01_mae_overview.png',
+                   inputs=('y_true', 'y_pred', 'N', 'mae_manual', 'metric_intervals'))
+class MaeOverview(OverviewTemplate):
+    formula = MAE_FORMULA
+    formula_color = 'lightblue'
+    color = 'darkorange'
+    result_color = 'blue'
+    titles = ('Mean Absolute Error (MAE): Linear Error Measurement',
+              'Mean Absolute Error (MAE): Alternative Orientation')
+
+    def result_text(self, alternative):
+        return self.metric_text('mae')
+
 
 # --------------------------------------------------------------------------------
 # --- Plot 2: MAE Limitation - Extreme Cases ---
 # All have same MAE but very different error patterns
 # --------------------------------------------------------------------------------
-target_mae = 3.0
-
-# Scenario 1: Normal balanced errors
-y_true_1 = np.random.uniform(10, 30, N)
-y_pred_1 = y_true_1 + np.random.normal(0, target_mae, N)
-mae_1 = np.mean(np.abs(y_true_1 - y_pred_1))
-# Adjust to match target MAE
-y_pred_1 = y_true_1 + (y_pred_1 - y_true_1) * (target_mae / mae_1)
-
-# Scenario 2: Normal with slight variation
-y_true_2 = np.random.uniform(10, 30, N)
-y_pred_2 = y_true_2 + np.random.normal(0, target_mae * 0.8, N)
-mae_2 = np.mean(np.abs(y_true_2 - y_pred_2))
-y_pred_2 = y_true_2 + (y_pred_2 - y_true_2) * (target_mae / mae_2)
-
-# Scenario 3: EXTREME - One side huge errors, other side perfect (almost vertical line)
-y_true_3 = np.random.uniform(10, 30, N)
-y_pred_3 = y_true_3.copy()
-# First half: perfect predictions
-y_pred_3[:N//2] = y_true_3[:N//2]
-# Second half: huge errors to achieve target MAE
-# Total error needed: target_mae * N
-# Since first half has 0 error, second half needs: target_mae * N
-errors_needed = target_mae * N
-y_pred_3[N//2:] = y_true_3[N//2:] + np.random.choice([-1, 1], N//2) * (errors_needed / (N//2))
-# Verify and adjust
-mae_3 = np.mean(np.abs(y_true_3 - y_pred_3))
-if abs(mae_3 - target_mae) > 0.01:
-    y_pred_3[N//2:] = y_true_3[N//2:] + (y_pred_3[N//2:] - y_true_3[N//2:]) * (target_mae / mae_3)
-
-# Scenario 4: EXTREME - Most points perfect, few massive errors
-y_true_4 = np.random.uniform(10, 30, N)
-y_pred_4 = y_true_4.copy()
-# 95% perfect
-num_perfect = int(0.95 * N)
-y_pred_4[:num_perfect] = y_true_4[:num_perfect]
-# 5% massive errors to achieve target MAE
-num_outliers = N - num_perfect
-errors_per_outlier = (target_mae * N) / num_outliers
-y_pred_4[num_perfect:] = y_true_4[num_perfect:] + np.random.choice([-1, 1], num_outliers) * errors_per_outlier
-# Verify and adjust
-mae_4 = np.mean(np.abs(y_true_4 - y_pred_4))
-if abs(mae_4 - target_mae) > 0.01:
-    y_pred_4[num_perfect:] = y_true_4[num_perfect:] + (y_pred_4[num_perfect:] - y_true_4[num_perfect:]) * (target_mae / mae_4)
-
-scenarios = [
-    (y_true_1, y_pred_1, 'Normal: Balanced Errors'),
-    (y_true_2, y_pred_2, 'Normal: Slight Variation'),
-    (y_true_3, y_pred_3, 'EXTREME: Half Perfect, Half Large Errors'),
-    (y_true_4, y_pred_4, 'EXTREME: Most Perfect, Few Massive Errors')
-]
-
-fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-axes = axes.flatten()
-
-for idx, (y_t, y_p, title) in enumerate(scenarios):
-    ax = axes[idx]
-    errors = np.abs(y_t - y_p)
-    
-    ax.scatter(y_t, y_p, color='blue', s=10, alpha=0.5, zorder=3)
-    ax.plot([y_t.min(), y_t.max()], [y_t.min(), y_t.max()], 
-           color='gray', linestyle='--', linewidth=1.5, alpha=0.5)
-    
-    # Plot error lines - show all for extreme cases
-    for i in range(N):
-        error_size = errors[i]
-        color = 'red' if error_size > target_mae * 2 else 'darkorange'
-        linewidth = 2 if error_size > target_mae * 2 else 0.5
-        ax.plot([y_t[i], y_t[i]], [y_t[i], y_p[i]], 
-               color=color, linestyle='-', linewidth=linewidth, alpha=0.6, zorder=2)
-    
-    # Calculate all metrics for this scenario
-    errors_abs = np.abs(y_t - y_p)
-    errors_sq = (y_t - y_p) ** 2
-    mae = np.mean(errors_abs)
-    mse = np.mean(errors_sq)
-    rmse = np.sqrt(mse)
-    
-    ax.text(0.05, 0.95, f'MAE: {mae:.2f}', transform=ax.transAxes,
-           fontsize=11, verticalalignment='top', horizontalalignment='left',
-           bbox=dict(boxstyle="round,pad=0.3", fc="yellow", alpha=0.7), fontweight='bold')
-    
-    ax.set_xlabel('Actual Value ($y$)', fontsize=10)
-    ax.set_ylabel('Predicted Value ($\hat{y}$)', fontsize=10)
-    ax.set_title(title, fontsize=11, fontweight='bold')
-    ax.grid(True, linestyle=':', alpha=0.6)
-
-fig.suptitle(f'MAE Limitation: Same MAE ({target_mae:.1f}), Different Error Patterns', 
-            fontsize=16, fontweight='bold', y=0.995)
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, '02_mae_limitation_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {OUTPUT_DIR}/02_mae_limitation_comparison.png")
+@register_template('02_mae_limitation_comparison.png', 'alternative/02_mae_limitation_comparison.png',
+                   inputs=('scenarios', 'scenario_metrics', 'scenario_intervals', 'scenario_quantiles',
+                           'target_mae'))
+class MaeLimitationComparison(ScenarioGridTemplate):
+    text_fontsize = 11
+    text_box = dict(boxstyle="round,pad=0.3", fc="yellow", alpha=0.7)
+
+    def metrics_text(self, index):
+        return self.metric_text('mae', index)
+
+    def suptitle(self, alternative):
+        target_mae = self.data['target_mae']
+        if alternative:
+            return f'MAE Limitation: Alternative Orientation (Same MAE {target_mae:.1f})'
+        return f'MAE Limitation: Same MAE ({target_mae:.1f}), Different Error Patterns'
+
 
 # --------------------------------------------------------------------------------
 # --- Plot 3: MSE Overview ---
+# Error line thickness shows the squared error
 # --------------------------------------------------------------------------------
-fig, ax = plt.subplots(figsize=(8, 6))
-ax.scatter(y_true, y_pred, color='blue', s=20, alpha=0.6, label='Predicted Points ($\hat{y}$)')
-ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()],
-        color='gray', linestyle='--', label='Perfect Prediction ($y = \hat{y}$)')
-
-# Plot error lines - thickness shows squared error
-max_sq_error = np.max(errors_squared)
-for i in range(min(20, N)):
-    sq_error = errors_squared[i]
-    linewidth = 1 + (sq_error / max_sq_error) * 3
-    ax.plot([y_true[i], y_true[i]], [y_true[i], y_pred[i]],
-           color='darkred', linestyle='-', linewidth=linewidth, alpha=0.6)
-
-mse_formula = r'$\text{MSE} = \frac{1}{N} \sum_{i=1}^{N} (y_i - \hat{y}_i)^2$'
-ax.text(0.95, 0.1, mse_formula, transform=ax.transAxes, fontsize=14,
-        verticalalignment='bottom', horizontalalignment='right',
-        bbox=dict(boxstyle="round,pad=0.5", fc="lightcoral", alpha=0.7))
-
-# result_text = f'MAE: {mae_manual:.2f}\nMSE: {mse_manual:.2f}\nRMSE: {rmse_manual:.2f}'
-result_text = f'MAE: {mae_manual:.2f}\nMSE: {mse_manual:.2f}'
-
-ax.text(0.05, 0.95, result_text, transform=ax.transAxes, fontsize=10,
-        verticalalignment='top', horizontalalignment='left', color='darkred', fontweight='bold',
-        bbox=dict(boxstyle="round,pad=0.4", fc="white", alpha=0.8))
-
-ax.set_xlabel('Actual Value ($y$)', fontsize=12)
-ax.set_ylabel('Predicted Value ($\hat{y}$)', fontsize=12)
-ax.set_title('Mean Squared Error (MSE): Squared Error Measurement', fontsize=14, fontweight='bold')
-ax.grid(True, linestyle=':', alpha=0.6)
-ax.legend(fontsize=10)
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, '03_mse_overview.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {OUTPUT_DIR}/03_mse_overview.png")
+@register_template('03_mse_overview.png', 'alternative/03_mse_overview.png',
+                   inputs=('y_true', 'y_pred', 'N', 'mae_manual', 'mse_manual', 'rmse_manual', 'metric_intervals'))
+class MseOverview(OverviewTemplate):
+    formula = MSE_FORMULA
+    formula_color = 'lightcoral'
+    color = 'darkred'
+    line_alpha = 0.6
+    titles = ('Mean Squared Error (MSE): Squared Error Measurement',
+              'Mean Squared Error (MSE): Alternative Orientation')
+
+    def line_widths(self, count):
+        # max(e^2) == max(|e|)^2, so only the drawn errors are squared
+        errors = np.subtract(self.data['y_true'], self.data['y_pred'])
+        np.abs(errors, out=errors)
+        max_squared = float(errors.max()) ** 2
+        errors_squared = np.square(errors[:count], out=errors[:count])
+        return 1 + (errors_squared / max_squared) * 3
+
+    def result_text(self, alternative):
+        metrics = ('mae', 'mse', 'rmse') if alternative else ('mae', 'mse')
+        return '\n'.join(self.metric_text(metric) for metric in metrics)
+
 
 # --------------------------------------------------------------------------------
 # --- Plot 4: RMSE Overview ---
 # --------------------------------------------------------------------------------
-fig, ax = plt.subplots(figsize=(8, 6))
-ax.scatter(y_true, y_pred, color='blue', s=20, alpha=0.6, label='Predicted Points ($\hat{y}$)')
-ax.plot([y_true.min(), y_true.max()], [y_true.min(), y_true.max()],
-        color='gray', linestyle='--', label='Perfect Prediction ($y = \hat{y}$)')
-
-# Plot error lines
-for i in range(min(20, N)):
-    ax.plot([y_true[i], y_true[i]], [y_true[i], y_pred[i]],
-           color='purple', linestyle='-', linewidth=1, alpha=0.5)
-
-rmse_formula = r'$\text{RMSE} = \sqrt{\frac{1}{N} \sum_{i=1}^{N} (y_i - \hat{y}_i)^2}$'
-ax.text(0.95, 0.1, rmse_formula, transform=ax.transAxes, fontsize=14,
-        verticalalignment='bottom', horizontalalignment='right',
-        bbox=dict(boxstyle="round,pad=0.5", fc="lavender", alpha=0.7))
-
-result_text = f'MAE: {mae_manual:.2f}\nMSE: {mse_manual:.2f}\nRMSE: {rmse_manual:.2f}'
-ax.text(0.05, 0.95, result_text, transform=ax.transAxes, fontsize=10,
-        verticalalignment='top', horizontalalignment='left', color='purple', fontweight='bold',
-        bbox=dict(boxstyle="round,pad=0.4", fc="white", alpha=0.8))
-
-ax.set_xlabel('Actual Value ($y$)', fontsize=12)
-ax.set_ylabel('Predicted Value ($\hat{y}$)', fontsize=12)
-ax.set_title('Root Mean Squared Error (RMSE): Interpretable Squared Error', fontsize=14, fontweight='bold')
-ax.grid(True, linestyle=':', alpha=0.6)
-ax.legend(fontsize=10)
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, '04_rmse_overview.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {OUTPUT_DIR}/04_rmse_overview.png")
+@register_template('04_rmse_overview.png', 'alternative/04_rmse_overview.png',
+                   inputs=('y_true', 'y_pred', 'N', 'mae_manual', 'mse_manual', 'rmse_manual', 'metric_intervals'))
+class RmseOverview(OverviewTemplate):
+    formula = RMSE_FORMULA
+    formula_color = 'lavender'
+    color = 'purple'
+    titles = ('Root Mean Squared Error (RMSE): Interpretable Squared Error',
+              'Root Mean Squared Error (RMSE): Alternative Orientation')
+
+    def result_text(self, alternative):
+        return '\n'.join(self.metric_text(metric) for metric in ('mae', 'mse', 'rmse'))
+
 
 # --------------------------------------------------------------------------------
 # --- Plot 5: All Metrics Comparison - Same as Plot 2 but with MAE, MSE, RMSE ---
 # --------------------------------------------------------------------------------
-fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-axes = axes.flatten()
-
-for idx, (y_t, y_p, title) in enumerate(scenarios):
-    ax = axes[idx]
-    errors = np.abs(y_t - y_p)
-    
-    ax.scatter(y_t, y_p, color='blue', s=10, alpha=0.5, zorder=3)
-    ax.plot([y_t.min(), y_t.max()], [y_t.min(), y_t.max()], 
-           color='gray', linestyle='--', linewidth=1.5, alpha=0.5)
-    
-    # Plot error lines - show all for extreme cases
-    for i in range(N):
-        error_size = errors[i]
-        color = 'red' if error_size > target_mae * 2 else 'darkorange'
-        linewidth = 2 if error_size > target_mae * 2 else 0.5
-        ax.plot([y_t[i], y_t[i]], [y_t[i], y_p[i]], 
-               color=color, linestyle='-', linewidth=linewidth, alpha=0.6, zorder=2)
-    
-    # Calculate all metrics for this scenario
-    errors_abs = np.abs(y_t - y_p)
-    errors_sq = (y_t - y_p) ** 2
-    mae = np.mean(errors_abs)
-    mse = np.mean(errors_sq)
-    rmse = np.sqrt(mse)
-    
-    # Show all three metrics
-    metrics_text = f'MAE: {mae:.2f}\nMSE: {mse:.2f}\nRMSE: {rmse:.2f}'
-    ax.text(0.05, 0.95, metrics_text, transform=ax.transAxes,
-           fontsize=10, verticalalignment='top', horizontalalignment='left',
-           bbox=dict(boxstyle="round,pad=0.4", fc="yellow", alpha=0.8), fontweight='bold')
-    
-    ax.set_xlabel('Actual Value ($y$)', fontsize=10)
-    ax.set_ylabel('Predicted Value ($\hat{y}$)', fontsize=10)
-    ax.set_title(title, fontsize=11, fontweight='bold')
-    ax.grid(True, linestyle=':', alpha=0.6)
-
-fig.suptitle('Metrics Comparison: Same MAE, Different MSE & RMSE Patterns', 
-            fontsize=16, fontweight='bold', y=0.995)
-plt.tight_layout()
-plt.savefig(os.path.join(OUTPUT_DIR, '05_all_metrics_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {OUTPUT_DIR}/05_all_metrics_comparison.png")
-
-print("-" * 60)
-print("All plots generated successfully!")
+@register_template('05_all_metrics_comparison.png', 'alternative/05_all_metrics_comparison.png',
+                   inputs=('scenarios', 'scenario_metrics', 'scenario_intervals', 'scenario_quantiles',
+                           'target_mae'))
+class AllMetricsComparison(ScenarioGridTemplate):
+    text_fontsize = 10
+    text_box = dict(boxstyle="round,pad=0.4", fc="yellow", alpha=0.8)
 
-# --------------------------------------------------------------------------------
-# --- Alternative Plots: Predicted on X-axis, Actual on Y-axis ---
-# Alternative convention: Some practitioners prefer this orientation
-# --------------------------------------------------------------------------------
-ALT_OUTPUT_DIR = os.path.join(OUTPUT_DIR, 'alternative')
-os.makedirs(ALT_OUTPUT_DIR, exist_ok=True)
-print("\nGenerating alternative plots (Predicted on X, Actual on Y)...")
-print("-" * 60)
+    def metrics_text(self, index):
+        # Show all three metrics
+        return '\n'.join(self.metric_text(metric, index) for metric in ('mae', 'mse', 'rmse'))
 
-# --------------------------------------------------------------------------------
-# --- Alternative Plot 1: MAE Overview ---
-# --------------------------------------------------------------------------------
-fig, ax = plt.subplots(figsize=(8, 6))
-ax.scatter(y_pred, y_true, color='blue', s=20, alpha=0.6, label='Actual Points ($y$)')
-ax.plot([y_pred.min(), y_pred.max()], [y_pred.min(), y_pred.max()], 
-        color='gray', linestyle='--', label='Perfect Prediction ($y = \hat{y}$)')
-
-# Plot horizontal error lines (show first 20 for clarity)
-for i in range(min(20, N)):
-    ax.plot([y_pred[i], y_true[i]], [y_true[i], y_true[i]], 
-           color='darkorange', linestyle='-', linewidth=1, alpha=0.5)
-
-mae_formula = r'$\text{MAE} = \frac{1}{N} \sum_{i=1}^{N} |y_i - \hat{y}_i|$'
-ax.text(0.95, 0.1, mae_formula, transform=ax.transAxes, fontsize=14,
-        verticalalignment='bottom', horizontalalignment='right',
-        bbox=dict(boxstyle="round,pad=0.5", fc="lightblue", alpha=0.7))
-
-result_text = f'MAE: {mae_sklearn:.2f}'
-ax.text(0.05, 0.95, result_text, transform=ax.transAxes, fontsize=10,
-        verticalalignment='top', horizontalalignment='left', color='blue', fontweight='bold',
-        bbox=dict(boxstyle="round,pad=0.4", fc="white", alpha=0.8))
-
-ax.set_xlabel('Predicted Value ($\hat{y}$)', fontsize=12)
-ax.set_ylabel('Actual Value ($y$)', fontsize=12)
-ax.set_title('Mean Absolute Error (MAE): Alternative Orientation', fontsize=14, fontweight='bold')
-ax.grid(True, linestyle=':', alpha=0.6)
-ax.legend(fontsize=10)
-plt.tight_layout()
-plt.savefig(os.path.join(ALT_OUTPUT_DIR, '01_mae_overview.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {ALT_OUTPUT_DIR}/01_mae_overview.png")
+    def suptitle(self, alternative):
+        if alternative:
+            return 'Metrics Comparison: Alternative Orientation'
+        return 'Metrics Comparison: Same MAE, Different MSE & RMSE Patterns'
 
-# --------------------------------------------------------------------------------
-# --- Alternative Plot 2: MAE Limitation Comparison ---
-# --------------------------------------------------------------------------------
-fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-axes = axes.flatten()
-
-for idx, (y_t, y_p, title) in enumerate(scenarios):
-    ax = axes[idx]
-    errors = np.abs(y_t - y_p)
-    
-    ax.scatter(y_p, y_t, color='blue', s=10, alpha=0.5, zorder=3)
-    ax.plot([y_p.min(), y_p.max()], [y_p.min(), y_p.max()], 
-           color='gray', linestyle='--', linewidth=1.5, alpha=0.5)
-    
-    # Plot horizontal error lines
-    for i in range(N):
-        error_size = errors[i]
-        color = 'red' if error_size > target_mae * 2 else 'darkorange'
-        linewidth = 2 if error_size > target_mae * 2 else 0.5
-        ax.plot([y_p[i], y_t[i]], [y_t[i], y_t[i]], 
-               color=color, linestyle='-', linewidth=linewidth, alpha=0.6, zorder=2)
-    
-    errors_abs = np.abs(y_t - y_p)
-    errors_sq = (y_t - y_p) ** 2
-    mae = np.mean(errors_abs)
-    mse = np.mean(errors_sq)
-    rmse = np.sqrt(mse)
-    
-    ax.text(0.05, 0.95, f'MAE: {mae:.2f}', transform=ax.transAxes,
-           fontsize=11, verticalalignment='top', horizontalalignment='left',
-           bbox=dict(boxstyle="round,pad=0.3", fc="yellow", alpha=0.7), fontweight='bold')
-    
-    ax.set_xlabel('Predicted Value ($\hat{y}$)', fontsize=10)
-    ax.set_ylabel('Actual Value ($y$)', fontsize=10)
-    ax.set_title(title, fontsize=11, fontweight='bold')
-    ax.grid(True, linestyle=':', alpha=0.6)
-
-fig.suptitle(f'MAE Limitation: Alternative Orientation (Same MAE {target_mae:.1f})', 
-            fontsize=16, fontweight='bold', y=0.995)
-plt.tight_layout()
-plt.savefig(os.path.join(ALT_OUTPUT_DIR, '02_mae_limitation_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {ALT_OUTPUT_DIR}/02_mae_limitation_comparison.png")
 
 # --------------------------------------------------------------------------------
-# --- Alternative Plot 3: MSE Overview ---
+# --- Plot 6: Errors by Value Bin ---
+# MAE and RMSE of every bin of the actual values (of the predicted values in
+# the alternative orientation), over a band of the mean residual +/- 1 std
 # --------------------------------------------------------------------------------
-fig, ax = plt.subplots(figsize=(8, 6))
-ax.scatter(y_pred, y_true, color='blue', s=20, alpha=0.6, label='Actual Points ($y$)')
-ax.plot([y_pred.min(), y_pred.max()], [y_pred.min(), y_pred.max()],
-        color='gray', linestyle='--', label='Perfect Prediction ($y = \hat{y}$)')
-
-# Plot horizontal error lines - thickness shows squared error
-max_sq_error = np.max(errors_squared)
-for i in range(min(20, N)):
-    sq_error = errors_squared[i]
-    linewidth = 1 + (sq_error / max_sq_error) * 3
-    ax.plot([y_pred[i], y_true[i]], [y_true[i], y_true[i]],
-           color='darkred', linestyle='-', linewidth=linewidth, alpha=0.6)
-
-mse_formula = r'$\text{MSE} = \frac{1}{N} \sum_{i=1}^{N} (y_i - \hat{y}_i)^2$'
-ax.text(0.95, 0.1, mse_formula, transform=ax.transAxes, fontsize=14,
-        verticalalignment='bottom', horizontalalignment='right',
-        bbox=dict(boxstyle="round,pad=0.5", fc="lightcoral", alpha=0.7))
-
-result_text = f'MAE: {mae_manual:.2f}\nMSE: {mse_manual:.2f}\nRMSE: {rmse_manual:.2f}'
-ax.text(0.05, 0.95, result_text, transform=ax.transAxes, fontsize=10,
-        verticalalignment='top', horizontalalignment='left', color='darkred', fontweight='bold',
-        bbox=dict(boxstyle="round,pad=0.4", fc="white", alpha=0.8))
-
-ax.set_xlabel('Predicted Value ($\hat{y}$)', fontsize=12)
-ax.set_ylabel('Actual Value ($y$)', fontsize=12)
-ax.set_title('Mean Squared Error (MSE): Alternative Orientation', fontsize=14, fontweight='bold')
-ax.grid(True, linestyle=':', alpha=0.6)
-ax.legend(fontsize=10)
-plt.tight_layout()
-plt.savefig(os.path.join(ALT_OUTPUT_DIR, '03_mse_overview.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {ALT_OUTPUT_DIR}/03_mse_overview.png")
+@register_template('06_residual_by_bin.png', 'alternative/06_residual_by_bin.png',
+                   inputs=('bin_edges', 'bins_by_true', 'bins_by_pred', 'mae_manual', 'metric_intervals'))
+class ResidualByBin(FigureTemplate):
+    titles = ('Errors by Actual Value: Where Does the Model Miss?',
+              'Errors by Predicted Value: Alternative Orientation')
+
+    def bins(self, alternative):
+        return self.data['bins_by_pred' if alternative else 'bins_by_true']
+
+    def draw_band(self, bins):
+        """Fill between the band edges; sets the edge lines and returns the fill."""
+        spread = np.sqrt(np.maximum(bins.mse - bins.bias ** 2, 0))
+        self.band_low.set_ydata(bins.bias - spread)
+        self.band_high.set_ydata(bins.bias + spread)
+        return self.ax.fill_between(self.centers, bins.bias - spread, bins.bias + spread,
+                                    color='darkorange', alpha=0.2, linewidth=0, zorder=1)
+
+    def build(self):
+        edges = self.data['bin_edges']
+        bins = self.bins(False)
+        self.centers = (edges[:-1] + edges[1:]) / 2
+        self.fig, self.ax = new_figure(figsize=(8, 6))
+        ax = self.ax
+
+        # Empty bins have NaN metrics: no bar, a gap in the lines
+        self.bars = ax.bar(self.centers, np.nan_to_num(bins.mae), width=np.diff(edges) * 0.85,
+                           color='steelblue', alpha=0.7, label='MAE per bin', zorder=2)
+        self.rmse_line, = ax.plot(self.centers, bins.rmse, 'o-', color='purple', label='RMSE per bin', zorder=3)
+        self.bias_line, = ax.plot(self.centers, bins.bias, color='darkorange', linewidth=1.5, zorder=3,
+                                  label=r'Mean residual $y - \hat{y}$ ($\pm$ 1 std)')
+        self.band_low, self.band_high = (ax.plot(self.centers, bins.bias, color='darkorange', linewidth=0.5,
+                                                 alpha=0.6, zorder=1)[0] for _ in range(2))
+        self.band = self.draw_band(bins)
+        ax.axhline(0, color='gray', linewidth=1, zorder=1)
+        ax.axhline(self.data['mae_manual'], color='steelblue', linestyle='--', linewidth=1, zorder=3,
+                   label=f"Overall {self.metric_text('mae')}")
+
+        ax.set_xlabel(AXIS_LABELS[False][0], fontsize=12)
+        ax.set_ylabel('Error', fontsize=12)
+        ax.set_title(self.titles[False], fontsize=14, fontweight='bold')
+        ax.grid(True, linestyle=':', alpha=0.6)
+        ax.legend(fontsize=10)
+
+    def update(self, alternative):
+        bins, ax = self.bins(alternative), self.ax
+        for bar, height in zip(self.bars, np.nan_to_num(bins.mae)):
+            bar.set_height(height)
+        self.rmse_line.set_ydata(bins.rmse)
+        self.bias_line.set_ydata(bins.bias)
+        self.band.remove()
+        self.band = self.draw_band(bins)
+
+        ax.xaxis.label.set_text(AXIS_LABELS[alternative][0])
+        ax.title.set_text(self.titles[alternative])
+        rescale(ax)
+
 
 # --------------------------------------------------------------------------------
-# --- Alternative Plot 4: RMSE Overview ---
+# --- Render Cache ---
+# A figure is only re-rendered when its cache key changes. The key hashes the
+# data entries the figure declares as inputs, the source of the figure function
+# (and of the module-level helpers it calls) and the numpy/matplotlib versions.
+# Keys of the images on disk are kept in a manifest next to them.
 # --------------------------------------------------------------------------------
-fig, ax = plt.subplots(figsize=(8, 6))
-ax.scatter(y_pred, y_true, color='blue', s=20, alpha=0.6, label='Actual Points ($y$)')
-ax.plot([y_pred.min(), y_pred.max()], [y_pred.min(), y_pred.max()],
-        color='gray', linestyle='--', label='Perfect Prediction ($y = \hat{y}$)')
-
-# Plot horizontal error lines
-for i in range(min(20, N)):
-    ax.plot([y_pred[i], y_true[i]], [y_true[i], y_true[i]],
-           color='purple', linestyle='-', linewidth=1, alpha=0.5)
-
-rmse_formula = r'$\text{RMSE} = \sqrt{\frac{1}{N} \sum_{i=1}^{N} (y_i - \hat{y}_i)^2}$'
-ax.text(0.95, 0.1, rmse_formula, transform=ax.transAxes, fontsize=14,
-        verticalalignment='bottom', horizontalalignment='right',
-        bbox=dict(boxstyle="round,pad=0.5", fc="lavender", alpha=0.7))
-
-result_text = f'MAE: {mae_manual:.2f}\nMSE: {mse_manual:.2f}\nRMSE: {rmse_manual:.2f}'
-ax.text(0.05, 0.95, result_text, transform=ax.transAxes, fontsize=10,
-        verticalalignment='top', horizontalalignment='left', color='purple', fontweight='bold',
-        bbox=dict(boxstyle="round,pad=0.4", fc="white", alpha=0.8))
-
-ax.set_xlabel('Predicted Value ($\hat{y}$)', fontsize=12)
-ax.set_ylabel('Actual Value ($y$)', fontsize=12)
-ax.set_title('Root Mean Squared Error (RMSE): Alternative Orientation', fontsize=14, fontweight='bold')
-ax.grid(True, linestyle=':', alpha=0.6)
-ax.legend(fontsize=10)
-plt.tight_layout()
-plt.savefig(os.path.join(ALT_OUTPUT_DIR, '04_rmse_overview.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {ALT_OUTPUT_DIR}/04_rmse_overview.png")
+def _hash_value(h, value):
+    if isinstance(value, np.ndarray):
+        h.update(f'ndarray:{value.dtype.str}:{value.shape}:'.encode())
+        h.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, (list, tuple)):
+        h.update(f'{type(value).__name__}:{len(value)}:'.encode())
+        for item in value:
+            _hash_value(h, item)
+    else:
+        h.update(f'{type(value).__name__}:{value!r};'.encode())
+
+
+def _is_local(obj):
+    module = sys.modules.get(getattr(obj, '__module__', None))
+    path = getattr(module, '__file__', None)
+    return path is not None and os.path.dirname(os.path.abspath(path)) == _HERE
+
+
+# Source does not change under a loaded module (editing it means reloading
+# the module, which creates new objects), so it is read once per object;
+# inspect.getsource of a class parses the module. The constant values are
+# not memoized: a notebook can change them at runtime.
+@functools.lru_cache(maxsize=None)
+def _source(obj):
+    return inspect.getsource(obj)
+
+
+@functools.lru_cache(maxsize=None)
+def _library_versions():
+    """Versions of the rendering libraries, read without importing them."""
+    from importlib.metadata import version
+
+    return np.__version__, version('matplotlib'), version('pillow')
+
+
+def _code_fingerprint(obj, seen=None):
+    """Source of ``obj`` (a function or class) plus that of every local-module
+    function or class it references by name, and the values of the
+    module-level constants it reads. For a class, the values of its data
+    attributes are included too, since a class body can read module
+    constants (``formula = MAE_FORMULA``). Registered template figures also
+    pull in their FigureTemplate subclass."""
+    seen = set() if seen is None else seen
+    seen.add(obj.__qualname__)
+    parts = [_source(obj)]
+    if inspect.isclass(obj):
+        functions = [member for member in vars(obj).values() if inspect.isfunction(member)]
+        references = [base for base in obj.__bases__ if base is not object]
+        parts.extend(f'{name} = {value!r}' for name, value in vars(obj).items()
+                     if not name.startswith('__') and not callable(value)
+                     and not isinstance(value, (staticmethod, classmethod, property)))
+    else:
+        functions = [obj]
+        references = [obj.template] if hasattr(obj, 'template') else []
+    for function in functions:
+        for name in function.__code__.co_names:
+            value = function.__globals__.get(name)
+            if isinstance(value, (bool, int, float, str, tuple)):
+                parts.append(f'{name} = {value!r}')
+            elif inspect.isfunction(value) or inspect.isclass(value):
+                references.append(value)
+    for ref in references:
+        if ref.__qualname__ not in seen and _is_local(ref):
+            parts.append(_code_fingerprint(ref, seen))
+    return '\n'.join(parts)
+
+
+def figure_cache_key(key, data, dpi=DPI, exports=DEFAULT_EXPORTS, png_compress_level=PNG_COMPRESS_LEVEL):
+    """Hash every input that affects the rendered outputs of figure ``key``."""
+    func = FIGURES[key]
+    h = hashlib.sha256()
+    _hash_value(h, (key, dpi, tuple(exports), png_compress_level) + _library_versions())
+    # Paths, sizes and encoder options: EXPORTS is a dict, so the fingerprint skips it
+    _hash_value(h, [EXPORTS[name] for name in exports])
+    h.update(_code_fingerprint(func).encode())
+    h.update(_code_fingerprint(render_figure).encode())
+    for name in func.inputs:
+        _hash_value(h, name)
+        _hash_value(h, data[name])
+    return h.hexdigest()
+
+
+def load_manifest(output_dir):
+    try:
+        with open(os.path.join(output_dir, CACHE_MANIFEST)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, CACHE_MANIFEST)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def evict_stale_entries(output_dir, manifest, exports=DEFAULT_EXPORTS):
+    """Drop manifest entries with a missing output or whose figure is no longer
+    registered; every output of unregistered figures is deleted as well."""
+    for key in list(manifest):
+        if key not in FIGURES:
+            for path in export_paths(key, output_dir, EXPORTS).values():
+                if os.path.exists(path):
+                    os.remove(path)
+            del manifest[key]
+        elif not all(os.path.exists(path) for path in export_paths(key, output_dir, exports).values()):
+            del manifest[key]
+    return manifest
+
 
 # --------------------------------------------------------------------------------
-# --- Alternative Plot 5: All Metrics Comparison ---
+# --- Parallel Render Engine ---
+# Every figure is an independent Agg render, so they are spread over a process
+# pool. The shared data is built once in the parent and handed to each worker a
+# single time through the pool initializer instead of once per task.
 # --------------------------------------------------------------------------------
-fig, axes = plt.subplots(2, 2, figsize=(14, 12))
-axes = axes.flatten()
-
-for idx, (y_t, y_p, title) in enumerate(scenarios):
-    ax = axes[idx]
-    errors = np.abs(y_t - y_p)
-    
-    ax.scatter(y_p, y_t, color='blue', s=10, alpha=0.5, zorder=3)
-    ax.plot([y_p.min(), y_p.max()], [y_p.min(), y_p.max()], 
-           color='gray', linestyle='--', linewidth=1.5, alpha=0.5)
-    
-    # Plot horizontal error lines
-    for i in range(N):
-        error_size = errors[i]
-        color = 'red' if error_size > target_mae * 2 else 'darkorange'
-        linewidth = 2 if error_size > target_mae * 2 else 0.5
-        ax.plot([y_p[i], y_t[i]], [y_t[i], y_t[i]], 
-               color=color, linestyle='-', linewidth=linewidth, alpha=0.6, zorder=2)
-    
-    errors_abs = np.abs(y_t - y_p)
-    errors_sq = (y_t - y_p) ** 2
-    mae = np.mean(errors_abs)
-    mse = np.mean(errors_sq)
-    rmse = np.sqrt(mse)
-    
-    metrics_text = f'MAE: {mae:.2f}\nMSE: {mse:.2f}\nRMSE: {rmse:.2f}'
-    ax.text(0.05, 0.95, metrics_text, transform=ax.transAxes,
-           fontsize=10, verticalalignment='top', horizontalalignment='left',
-           bbox=dict(boxstyle="round,pad=0.4", fc="yellow", alpha=0.8), fontweight='bold')
-    
-    ax.set_xlabel('Predicted Value ($\hat{y}$)', fontsize=10)
-    ax.set_ylabel('Actual Value ($y$)', fontsize=10)
-    ax.set_title(title, fontsize=11, fontweight='bold')
-    ax.grid(True, linestyle=':', alpha=0.6)
-
-fig.suptitle('Metrics Comparison: Alternative Orientation', 
-            fontsize=16, fontweight='bold', y=0.995)
-plt.tight_layout()
-plt.savefig(os.path.join(ALT_OUTPUT_DIR, '05_all_metrics_comparison.png'), dpi=300, bbox_inches='tight')
-plt.close()
-print(f"Saved: {ALT_OUTPUT_DIR}/05_all_metrics_comparison.png")
-
-print("-" * 60)
-print("Alternative plots generated successfully!")
+_worker_data = None
+_cprofile_dir = None
+
+
+def _init_worker(data, instrument=False, cprofile_dir=None, text_cache=True):
+    global _worker_data, _cprofile_dir
+    _worker_data = data
+    _cprofile_dir = cprofile_dir
+    if instrument:
+        profiling.enable()
+    import textcache
+
+    if text_cache is True:
+        textcache.configure()
+    else:
+        textcache.configure(text_cache, enabled=bool(text_cache))
+
+
+def export_paths(key, output_dir, exports=DEFAULT_EXPORTS):
+    """Output path of each of ``exports`` for figure ``key``."""
+    stem = os.path.splitext(key)[0]
+    return {name: os.path.join(output_dir, EXPORTS[name][0].format(stem=stem)) for name in exports}
+
+
+def rasterize(fig, dpi=DPI):
+    """Draw ``fig`` once at ``dpi``, cropped as by savefig(bbox_inches='tight'); returns an RGB image."""
+    from PIL import Image
+    from textcache import CachedTextCanvas
+
+    canvas = CachedTextCanvas(fig)
+    # 'rgba' is the raw Agg buffer: the pixels stay in the canvas and nothing is encoded
+    fig.savefig(os.devnull, format='rgba', dpi=dpi, bbox_inches='tight')
+    # The figures are opaque, so dropping alpha loses nothing and shrinks every PNG
+    return Image.fromarray(np.asarray(canvas.buffer_rgba())).convert('RGB')
+
+
+def raster_sizes(image, dpi=DPI):
+    """The full-resolution ``image`` and its web and thumbnail reductions, with their dpi."""
+    web = image.reduce(WEB_REDUCE)
+    thumb = web.copy()
+    thumb.thumbnail(THUMB_SIZE)
+    return {'full': (image, dpi), 'web': (web, dpi / WEB_REDUCE), 'thumb': (thumb, None)}
+
+
+def save_raster(image, path, options, dpi=None, png_compress_level=PNG_COMPRESS_LEVEL):
+    if path.endswith('.png'):
+        options = dict(options, compress_level=png_compress_level)
+        if dpi:
+            options['dpi'] = (dpi, dpi)
+    image.save(path, **options)
+
+
+def render_figure(key, data, paths, dpi=DPI, template=None, png_compress_level=PNG_COMPRESS_LEVEL):
+    """Build figure ``key``, lay it out and write it to ``paths`` (export name -> path).
+
+    The figure is laid out and rasterized once; all raster outputs are
+    derived from that image and encoded in parallel threads (Pillow releases
+    the GIL while compressing), next to the vector outputs.
+    If ``template`` was built for the same figure and data, its artists are
+    re-oriented instead of building a new figure. Returns the template used
+    (None for plain figure functions) so the other orientation can reuse it.
+    """
+    func = FIGURES[key]
+    cls = getattr(func, 'template', None)
+    with profiling.stage('draw', key) as stage:
+        if cls is None:
+            fig = func(data)
+        else:
+            if type(template) is not cls or template.data is not data:
+                template = cls(data)
+            fig = template.orient(func.alternative)
+        stage.count_artists(fig)
+    with profiling.stage('layout', key) as stage:
+        fig.tight_layout()
+        stage.count_artists(fig)
+    for path in paths.values():
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    raster = {name: path for name, path in paths.items() if EXPORTS[name][1] != 'vector'}
+    vector = {name: path for name, path in paths.items() if EXPORTS[name][1] == 'vector'}
+    with profiling.stage('rasterize', key):
+        sizes = raster_sizes(rasterize(fig, dpi), dpi) if raster else {}
+    with profiling.stage('encode', key):
+        with ThreadPoolExecutor(max_workers=max(len(raster), 1)) as pool:
+            futures = []
+            for name, path in raster.items():
+                _, size, options = EXPORTS[name]
+                image, image_dpi = sizes[size]
+                futures.append(pool.submit(save_raster, image, path, options, image_dpi, png_compress_level))
+            for path in vector.values():
+                fig.savefig(path, dpi=dpi, bbox_inches='tight')
+            for future in futures:
+                future.result()
+    return template
+
+
+def _render_task(keys, output_dir, dpi=DPI, exports=DEFAULT_EXPORTS, png_compress_level=PNG_COMPRESS_LEVEL):
+    """Render a group of figures sharing one template in a worker.
+
+    Returns ``(results, records)``: one ``(key, paths, traceback)`` per figure,
+    with either the written ``paths`` or ``traceback`` set, and the stage records.
+    """
+    results, template = [], None
+    for key in keys:
+        paths = export_paths(key, output_dir, exports)
+        try:
+            args = (key, _worker_data, paths, dpi, template, png_compress_level)
+            if _cprofile_dir:
+                profiler = cProfile.Profile()
+                template = profiler.runcall(render_figure, *args)
+                os.makedirs(_cprofile_dir, exist_ok=True)
+                profiler.dump_stats(os.path.join(_cprofile_dir, key.replace('/', '__') + '.prof'))
+            else:
+                template = render_figure(*args)
+            results.append((key, list(paths.values()), None))
+        except Exception:
+            template = None
+            results.append((key, None, traceback.format_exc()))
+    return results, profiling.drain()
+
+
+def group_by_template(keys):
+    """Split ``keys`` into render tasks; orientations of one template share a task."""
+    groups = {}
+    for key in keys:
+        groups.setdefault(getattr(FIGURES[key], 'template', key), []).append(key)
+    return list(groups.values())
+
+
+def render_figures(data, keys=None, output_dir=OUTPUT_DIR, workers=None, force=False, dpi=DPI, cprofile_dir=None,
+                   exports=DEFAULT_EXPORTS, png_compress_level=PNG_COMPRESS_LEVEL, text_cache=True):
+    """Render the registered figures ``keys`` (default: all) into ``output_dir``.
+
+    Each figure is written once per name in ``exports`` (see EXPORTS).
+    Figures whose cache key matches the manifest and whose outputs all exist
+    are skipped unless ``force`` is set. Both orientations of a template figure
+    are rendered by one task from a single set of artists. ``workers`` is the
+    process count (default: one per CPU); ``workers=1`` renders serially in
+    this process. ``text_cache`` is True for the persistent mathtext layout
+    cache in its default directory (see textcache.py), a directory, or False.
+    Returns ``(saved, skipped, errors)`` where ``saved`` and ``skipped`` list
+    the first output path of each figure and ``errors`` maps each failed
+    figure key to its traceback.
+
+    If profiling is enabled in this process, the workers record their stages
+    too and the records are merged back; ``cprofile_dir`` additionally dumps a
+    cProfile file per rendered figure.
+    """
+    keys = list(FIGURES) if keys is None else list(keys)
+    workers = workers or os.cpu_count() or 1
+    exports = tuple(exports)
+    manifest = evict_stale_entries(output_dir, load_manifest(output_dir), exports)
+    cache_keys = {key: figure_cache_key(key, data, dpi, exports, png_compress_level) for key in keys}
+
+    skipped = []
+    if not force:
+        skipped = [export_paths(key, output_dir, exports[:1])[exports[0]] for key in keys
+                   if manifest.get(key) == cache_keys[key]]
+        keys = [key for key in keys if manifest.get(key) != cache_keys[key]]
+    for path in skipped:
+        print(f"Up to date: {path}")
+
+    saved, errors = [], {}
+
+    def record(group, render):
+        try:
+            results, records = render()
+        except Exception:
+            results, records = [(key, None, traceback.format_exc()) for key in group], []
+        profiling.extend(records)
+        for key, paths, error in results:
+            if error is None:
+                saved.append(paths[0])
+                manifest[key] = cache_keys[key]
+                for path in paths:
+                    print(f"Saved: {path}")
+            else:
+                manifest.pop(key, None)
+                errors[key] = error
+
+    groups = group_by_template(keys)
+    worker_args = (data, profiling.is_enabled(), cprofile_dir, text_cache)
+    task_args = (output_dir, dpi, exports, png_compress_level)
+    if workers == 1 or len(groups) <= 1:
+        _init_worker(*worker_args)
+        for group in groups:
+            record(group, lambda: _render_task(group, *task_args))
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(groups)),
+                                 initializer=_init_worker, initargs=worker_args) as pool:
+            futures = {pool.submit(_render_task, group, *task_args): group for group in groups}
+            for future in as_completed(futures):
+                record(futures[future], future.result)
+
+    save_manifest(output_dir, manifest)
+    return saved, skipped, errors
+
+
+def select_figures(names=None, orientation='both'):
+    """Registered figure keys matching ``names`` and ``orientation``.
+
+    A name matches a figure by its full key, its file stem
+    (``01_mae_overview``) or its number prefix (``01``).
+    """
+    keys = []
+    for key in FIGURES:
+        alternative = key.startswith('alternative/')
+        if orientation == 'standard' and alternative or orientation == 'alternative' and not alternative:
+            continue
+        stem = os.path.splitext(os.path.basename(key))[0]
+        if names is None or any(name in (key, stem) or stem.startswith(name + '_') for name in names):
+            keys.append(key)
+    return keys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the regression metric figures for the slides.')
+    parser.add_argument('--figures', nargs='+', metavar='NAME',
+                        help='figures to render, by number (01) or name (01_mae_overview); default: all')
+    parser.add_argument('--orientation', choices=['standard', 'alternative', 'both'], default='both',
+                        help='standard (actual on x), alternative (predicted on x) or both')
+    parser.add_argument('-n', '--n', type=int, default=N, help='number of points (default: %(default)s)')
+    parser.add_argument('--seed', type=int, default=SEED, help='random seed (default: %(default)s)')
+    parser.add_argument('--bootstrap', type=int, default=0, metavar='B',
+                        help='add B-replicate bootstrap confidence intervals to the metric boxes')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                        help='confidence level of the bootstrap intervals (default: %(default)s)')
+    parser.add_argument('--compact', action='store_true',
+                        help='generate and evaluate the data in float32 (half the memory)')
+    parser.add_argument('--dpi', type=int, default=DPI, help='PNG resolution (default: %(default)s)')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='image directory (default: %(default)s)')
+    parser.add_argument('--exports', nargs='+', choices=list(EXPORTS), default=list(DEFAULT_EXPORTS),
+                        metavar='EXPORT', help=f'outputs per figure, from {", ".join(EXPORTS)} '
+                                               '(default: %(default)s)')
+    parser.add_argument('--png-compress-level', type=int, choices=range(10), default=PNG_COMPRESS_LEVEL,
+                        metavar='0-9', help='zlib level of PNG outputs (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of render/bootstrap processes (default: one per CPU, 1 = serial)')
+    parser.add_argument('--force', action='store_true',
+                        help='re-render every figure even if its cached image is up to date')
+    parser.add_argument('--text-cache', metavar='DIR',
+                        help='directory of the persistent mathtext layout cache (default: in the matplotlib cache)')
+    parser.add_argument('--no-text-cache', action='store_true',
+                        help='typeset every mathtext string from scratch')
+    parser.add_argument('--no-check', action='store_true',
+                        help='skip the cross-check of the manual metrics against sklearn')
+    parser.add_argument('--profile-report', metavar='PATH',
+                        help='record per-stage timings and write them to PATH (.json or .csv)')
+    parser.add_argument('--cprofile-dir', metavar='DIR',
+                        help='also dump a cProfile .prof file per rendered figure into DIR')
+    args = parser.parse_args(argv)
+
+    keys = select_figures(args.figures, args.orientation)
+    if not keys:
+        parser.error('no registered figure matches the selection')
+
+    if args.profile_report:
+        profiling.enable()
+
+    data = generate_data(n=args.n, seed=args.seed, n_boot=args.bootstrap, confidence=args.confidence,
+                         workers=args.workers, compact=args.compact)
+    if args.no_check:
+        print(f"MAE: {data['mae_manual']:.4f}, MSE: {data['mse_manual']:.4f}, RMSE: {data['rmse_manual']:.4f}")
+    else:
+        mae_sklearn, mse_sklearn, rmse_from_sklearn = sklearn_metrics(data)
+        print(f"MAE - Manual: {data['mae_manual']:.4f}, sklearn: {mae_sklearn:.4f}")
+        print(f"MSE - Manual: {data['mse_manual']:.4f}, sklearn: {mse_sklearn:.4f}")
+        print(f"RMSE - Manual: {data['rmse_manual']:.4f}, from sklearn MSE: {rmse_from_sklearn:.4f}")
+    if data['metric_intervals'] is not None:
+        for name, ci in zip(('MAE', 'MSE', 'RMSE'), data['metric_intervals']):
+            print(f"{name} {args.confidence:.0%} bootstrap CI: [{ci.low:.4f}, {ci.high:.4f}]")
+    print("-" * 60)
+
+    saved, skipped, errors = render_figures(data, keys, output_dir=args.output_dir, workers=args.workers,
+                                            force=args.force, dpi=args.dpi, cprofile_dir=args.cprofile_dir,
+                                            exports=args.exports, png_compress_level=args.png_compress_level,
+                                            text_cache=not args.no_text_cache and (args.text_cache or True))
+
+    print("-" * 60)
+    if args.profile_report:
+        records = profiling.disable()
+        profiling.write_report(records, args.profile_report)
+        print(profiling.summarize(records))
+        print(f"Saved: {args.profile_report}")
+        print("-" * 60)
+    for key, tb in errors.items():
+        print(f"FAILED: {key}\n{tb}")
+    if errors:
+        return f"{len(errors)} of {len(keys)} figures failed"
+    print(f"All plots generated successfully! ({len(saved)} rendered, {len(skipped)} up to date)")
+
+
+if __name__ == '__main__':
+    raise SystemExit(main())
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import sys
+import time
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# --------------------------------------------------------------------------------
+# --- Opt-in Stage Instrumentation ---
+# `with stage(name, figure) as st:` records wall time, CPU time, peak RSS and
+# (via st.count_artists(fig)) the artist count of one pipeline stage. The OS
+# only reports the peak RSS of the whole process so far, so a stage records
+# how much it raised that peak (0 if it stayed below an earlier stage's peak)
+# next to the process peak itself. While
+# instrumentation is off, stage() hands back a shared no-op object, so the
+# hooks left in the render path cost one global lookup and a method call.
+# --------------------------------------------------------------------------------
+STAGES = ('data', 'metrics', 'draw', 'layout', 'rasterize', 'encode')
+REPORT_FIELDS = ['figure', 'stage', 'wall_s', 'cpu_s', 'peak_rss_growth_mib', 'process_peak_rss_mib', 'artists',
+                 'pid']
+
+_records = None
+
+
+def enable():
+    """Start recording stages in this process (no-op if already recording)."""
+    global _records
+    if _records is None:
+        _records = []
+
+
+def disable():
+    """Stop recording and return everything recorded so far."""
+    global _records
+    records, _records = _records or [], None
+    return records
+
+
+def is_enabled():
+    return _records is not None
+
+
+def drain():
+    """Return and clear the records of this process, leaving recording on."""
+    if _records is None:
+        return []
+    records = list(_records)
+    _records.clear()
+    return records
+
+
+def extend(records):
+    """Add records collected in another process (e.g. a render worker)."""
+    if _records is not None:
+        _records.extend(records)
+
+
+def _peak_rss_mib():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 ** 2 if sys.platform == 'darwin' else 1024)
+
+
+class _Stage:
+    def __init__(self, name, figure):
+        self.name = name
+        self.figure = figure
+        self.artists = None
+
+    def __enter__(self):
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        self._peak_rss = _peak_rss_mib()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        peak_rss = _peak_rss_mib()
+        _records.append({
+            'figure': self.figure,
+            'stage': self.name,
+            'wall_s': time.perf_counter() - self._wall,
+            'cpu_s': time.process_time() - self._cpu,
+            'peak_rss_growth_mib': None if peak_rss is None else peak_rss - self._peak_rss,
+            'process_peak_rss_mib': peak_rss,
+            'artists': self.artists,
+            'pid': os.getpid(),
+        })
+        return False
+
+    def count_artists(self, fig):
+        self.artists = len(fig.findobj())
+
+
+class _NullStage:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
+
+    def count_artists(self, fig):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+def stage(name, figure=None):
+    """Context manager timing stage ``name`` of ``figure`` (None = shared work)."""
+    if _records is None:
+        return _NULL_STAGE
+    return _Stage(name, figure)
+
+
+# --------------------------------------------------------------------------------
+# --- Reports ---
+# --------------------------------------------------------------------------------
+def write_report(records, path):
+    """Write ``records`` to ``path`` as CSV if it ends in .csv, JSON otherwise."""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if path.endswith('.csv'):
+        with open(path, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=REPORT_FIELDS)
+            writer.writeheader()
+            writer.writerows(records)
+    else:
+        with open(path, 'w') as f:
+            json.dump(records, f, indent=2)
+
+
+def summarize(records):
+    """Total wall time per figure and stage, slowest figures first."""
+    totals = {}
+    for r in records:
+        per_stage = totals.setdefault(r['figure'] or '(shared)', {})
+        per_stage[r['stage']] = per_stage.get(r['stage'], 0.0) + r['wall_s']
+    lines = []
+    for figure, per_stage in sorted(totals.items(), key=lambda item: -sum(item[1].values())):
+        parts = '  '.join(f"{name} {per_stage[name] * 1000:.0f}ms" for name in STAGES if name in per_stage)
+        lines.append(f"{sum(per_stage.values()) * 1000:8.0f} ms  {figure}: {parts}")
+    return '\n'.join(lines)
@@ -0,0 +1,220 @@
+import hashlib
+import json
+import os
+from collections import OrderedDict
+
+import matplotlib
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.font_manager import FontProperties, get_font
+from matplotlib.mathtext import MathTextParser, VectorParse
+
+# --------------------------------------------------------------------------------
+# --- Persistent Mathtext Layout Cache ---
+# Typesetting a mathtext string (the formulas, and every '$\hat{y}$' label) goes
+# through matplotlib's pyparsing grammar, which is by far the slowest part of
+# drawing text; matplotlib keeps only the last 50 results, per process. Agg
+# draws mathtext from that typeset layout (glyphs and rule boxes at dpi), so
+# the layout is what gets cached here: keyed by the string, the font
+# properties, the dpi and the text rcParams, in memory and as small JSON files
+# on disk, shared by every figure, worker process and run. Both levels are
+# LRU, bounded by bytes. A cached layout rebuilds the exact parse (the fonts
+# come from matplotlib's own font cache), so the pixels do not change.
+#
+# Only Agg rendering uses it (CachedTextCanvas); vector exports typeset
+# their text themselves. Plain (non-math) text is cheap to lay out and is
+# left to matplotlib.
+# --------------------------------------------------------------------------------
+CACHE_DIR = os.path.join(matplotlib.get_cachedir(), 'mathtext-layouts')
+DISK_BYTES = 32 * 2 ** 20  # on-disk budget; least recently used entries go first
+MEMORY_BYTES = 4 * 2 ** 20
+FORMAT_VERSION = 1
+# rcParams that can change a mathtext layout besides the FontProperties
+TEXT_RCPARAMS = tuple(sorted(name for name in matplotlib.rcParams
+                             if name.startswith(('mathtext.', 'font.', 'text.hinting'))))
+
+
+def layout_key(s, dpi, prop=None, antialiased=None):
+    """Stable hash of everything the mathtext layout of ``s`` depends on."""
+    prop = FontProperties() if prop is None else prop
+    rc = matplotlib.rcParams
+    fields = (FORMAT_VERSION, matplotlib.__version__, s, float(dpi),
+              rc['text.antialiased'] if antialiased is None else bool(antialiased),
+              tuple(prop.get_family()), prop.get_style(), prop.get_variant(), prop.get_weight(),
+              prop.get_stretch(), prop.get_size_in_points(), prop.get_file(), prop.get_math_fontfamily(),
+              tuple(str(rc[name]) for name in TEXT_RCPARAMS))
+    return hashlib.sha256(repr(fields).encode()).hexdigest()
+
+
+def dump_layout(parse):
+    """A VectorParse as JSON-able data; fonts are stored by file name."""
+    return {'width': parse.width, 'height': parse.height, 'depth': parse.depth,
+            'glyphs': [[font.fname, size, char, index, float(ox), float(oy)]
+                       for font, size, char, index, ox, oy in parse.glyphs],
+            'rects': [[float(value) for value in rect] for rect in parse.rects]}
+
+
+def load_layout(entry):
+    glyphs = [(get_font(fname), size, char, index, ox, oy) for fname, size, char, index, ox, oy in entry['glyphs']]
+    return VectorParse(entry['width'], entry['height'], entry['depth'], glyphs,
+                       [tuple(rect) for rect in entry['rects']])
+
+
+class TextCache:
+    """Mathtext layouts by key: an in-memory LRU in front of a directory of JSON files.
+
+    ``directory=None`` keeps the cache in memory only.
+    """
+
+    def __init__(self, directory=CACHE_DIR, max_bytes=DISK_BYTES, memory_bytes=MEMORY_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.memory_bytes = memory_bytes
+        self.hits = self.misses = 0
+        self._memory = OrderedDict()  # key -> (layout, size in bytes)
+        self._memory_used = 0
+        self._disk_used = None  # measured on the first write
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], key + '.json')
+
+    def _remember(self, key, layout, size):
+        if key in self._memory:
+            self._memory_used -= self._memory.pop(key)[1]
+        self._memory[key] = (layout, size)
+        self._memory_used += size
+        while self._memory_used > self.memory_bytes and len(self._memory) > 1:
+            self._memory_used -= self._memory.popitem(last=False)[1][1]
+
+    def get(self, key):
+        """The cached layout for ``key``, or None."""
+        if key in self._memory:
+            self._memory.move_to_end(key)
+            self.hits += 1
+            return self._memory[key][0]
+        if self.directory is not None:
+            path = self._path(key)
+            try:
+                with open(path) as f:
+                    text = f.read()
+                layout = load_layout(json.loads(text))
+                os.utime(path)  # mark as recently used for eviction
+            except (OSError, ValueError, KeyError, TypeError):
+                pass  # missing, evicted by another process meanwhile, or unreadable
+            else:
+                self._remember(key, layout, len(text))
+                self.hits += 1
+                return layout
+        self.misses += 1
+        return None
+
+    def put(self, key, layout):
+        text = json.dumps(dump_layout(layout))
+        self._remember(key, layout, len(text))
+        if self.directory is None:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+        os.replace(tmp_path, path)
+        if self._disk_used is None:
+            self._disk_used = sum(size for _, size, _ in self._entries())
+        else:
+            self._disk_used += len(text)
+        if self._disk_used > self.max_bytes:
+            self.evict()
+
+    def _entries(self):
+        """(mtime, size, path) of every file in the cache directory."""
+        entries = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime_ns, stat.st_size, path))
+        return entries
+
+    def evict(self):
+        """Delete the least recently used files until the directory fits in ``max_bytes``."""
+        entries = sorted(self._entries())
+        used = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if used <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            used -= size
+        self._disk_used = used
+
+    def clear(self):
+        self._memory.clear()
+        self._memory_used = 0
+        if self.directory is not None:
+            for _, _, path in self._entries():
+                os.remove(path)
+            self._disk_used = 0
+
+    def __repr__(self):
+        return (f'TextCache({self.directory!r}, hits={self.hits}, misses={self.misses}, '
+                f'memory={len(self._memory)} entries)')
+
+
+class CachedMathTextParser(MathTextParser):
+    """The Agg renderer's mathtext parser, answering from a TextCache first."""
+
+    def __init__(self, cache):
+        super().__init__('path')
+        self.cache = cache
+
+    def parse(self, s, dpi=72, prop=None, *, antialiased=None):
+        key = layout_key(s, dpi, prop, antialiased)
+        layout = self.cache.get(key)
+        if layout is None:
+            layout = super().parse(s, dpi, prop, antialiased=antialiased)
+            self.cache.put(key, layout)
+        return layout
+
+
+_cache = None
+
+
+def configure(directory=CACHE_DIR, max_bytes=DISK_BYTES, enabled=True):
+    """Set the process-wide cache used by CachedTextCanvas (``enabled=False`` turns it off)."""
+    global _cache
+    _cache = TextCache(directory, max_bytes) if enabled else None
+    return _cache
+
+
+def get_cache():
+    return _cache
+
+
+class CachedTextCanvas(FigureCanvasAgg):
+    """Agg canvas whose renderers take mathtext layouts from the configured cache."""
+
+    def get_renderer(self):
+        renderer = super().get_renderer()
+        if _cache is not None and getattr(renderer.mathtext_parser, 'cache', None) is not _cache:
+            renderer.mathtext_parser = CachedMathTextParser(_cache)
+        return renderer
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Inspect or clear the persistent mathtext layout cache.')
+    parser.add_argument('--dir', default=CACHE_DIR, help='cache directory (default: %(default)s)')
+    parser.add_argument('--clear', action='store_true', help='delete every cached layout')
+    args = parser.parse_args()
+
+    cache = TextCache(args.dir)
+    if args.clear:
+        cache.clear()
+    entries = cache._entries() if os.path.isdir(args.dir) else []
+    print(f"{args.dir}: {len(entries)} layouts, {sum(size for _, size, _ in entries) / 1024:.1f} KiB")